@@ -0,0 +1,129 @@
+"""
+First request latency of a freshly constructed client, with and without connection warm-up, against a
+local TLS stub of the api. The stub adds --rtt seconds before every new connection's handshake to stand in
+for the round trips to api.podcastindex.org. Needs the openssl command line tool for the self-signed
+certificate.
+
+    PYTHONPATH=. python benchmarks/bench_startup.py --rtt 0.05 --burst 8
+"""
+import argparse
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import podcastindex
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"status": "true", "feed": {"id": 1}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TLSStub(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, cert, key, rtt):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), Handler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        self.socket = context.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+        self.rtt = rtt
+
+    def finish_request(self, request, client_address):
+        # TCP connect plus a TLS 1.3 handshake cost about two round trips
+        time.sleep(2 * self.rtt)
+        request.do_handshake()
+        HTTPServer.finish_request(self, request, client_address)
+
+
+def make_certificate(directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.check_call(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+            "-keyout", key, "-out", cert,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return cert, key
+
+
+def first_requests(config, burst):
+    start = time.time()
+    index = podcastindex.init(config)
+    constructed = time.time() - start
+
+    def call(_):
+        start = time.time()
+        index.podcastByFeedId(1)
+        return time.time() - start
+
+    with ThreadPoolExecutor(max_workers=burst) as executor:
+        latencies = sorted(executor.map(call, range(burst)))
+    return constructed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rtt", type=float, default=0.05, help="Simulated round trip time in seconds")
+    parser.add_argument("--burst", type=int, default=8, help="Concurrent first requests")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if shutil.which("openssl") is None:
+        raise SystemExit("The openssl command line tool is needed to create the stub's certificate")
+
+    directory = tempfile.mkdtemp()
+    cert, key = make_certificate(directory)
+    os.environ["REQUESTS_CA_BUNDLE"] = cert
+    server = TLSStub(cert, key, args.rtt)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base = {
+        "api_key": "key",
+        "api_secret": "secret",
+        "base_url": "https://localhost:{}/api/1.0".format(server.server_address[1]),
+        "pool_size": args.burst,
+    }
+    modes = [
+        ("cold", base),
+        ("warm", dict(base, warm_connections=args.burst, dns_cache_ttl=300)),
+    ]
+
+    print("rtt={}s burst={} runs={}".format(args.rtt, args.burst, args.runs))
+    print("{:<6} {:>14} {:>14} {:>14}".format("mode", "construct ms", "first p50 ms", "first max ms"))
+    for name, config in modes:
+        results = [first_requests(config, args.burst) for _ in range(args.runs)]
+        construct = sorted(r[0] for r in results)[len(results) // 2]
+        p50 = sorted(r[1][len(r[1]) // 2] for r in results)[len(results) // 2]
+        worst = sorted(r[1][-1] for r in results)[len(results) // 2]
+        print("{:<6} {:>14.1f} {:>14.1f} {:>14.1f}".format(name, construct * 1000, p50 * 1000, worst * 1000))
+
+    server.shutdown()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,13 @@
 from .podcastindex import init, get_config_from_env
+from .export import NDJSONWriter, export, iter_results, paginate_recent_episodes, stream_items
+from .dedup import EpisodeDeduplicator
+from .scheduler import RequestScheduler
+from .credentials import CredentialPool
+from .resilience import CircuitOpenError
+from .pipeline import Pipeline
+from .submit import SubmissionQueue
+from .batch import resolve_episode_guids
+from .random_pool import RandomEpisodePool
+from .hydrate import FeedHydrator
+from .mirror import EpisodeMirror
+from .trending import TrendingRecorder
@@ -0,0 +1,99 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+def _is_not_found(error):
+    return error.response is not None and error.response.status_code in (400, 404)
+
+
+def _lookup_guid(index, guid, feed, by, fulltext):
+    kwargs = {by: feed, "fulltext": fulltext}
+    try:
+        result = index.episodeByGuid(guid, **kwargs)
+    except requests.exceptions.HTTPError as e:
+        if _is_not_found(e):
+            return None
+        raise
+    return result.get("episode") or None
+
+
+def _fetch_feed_episodes(index, feed, by, max_results, fulltext):
+    # None when the feed itself is unknown, so none of its guids can be found either
+    try:
+        if by == "feedid":
+            result = index.episodesByFeedId(feed, max_results=max_results, fulltext=fulltext)
+        else:
+            result = index.episodesByPodcastGuid(feed, max_results=max_results, fulltext=fulltext)
+    except requests.exceptions.HTTPError as e:
+        if _is_not_found(e):
+            return None
+        raise
+    return dict((episode["guid"], episode) for episode in result.get("items") or [] if episode.get("guid"))
+
+
+def resolve_episode_guids(
+    index, pairs, by="feedid", min_group_size=2, max_results=1000, fulltext=False, workers=4
+):
+    """
+    Resolve many (guid, feed) pairs to episodes with as few requests as possible.
+
+    Guids are grouped by feed. Feeds with at least min_group_size guids are fetched once with
+    episodesByFeedId (or episodesByPodcastGuid) and matched locally by guid; guids not found in that page,
+    and feeds with fewer guids, fall back to one episodeByGuid call each. A feed the api does not know maps
+    all of its guids to None.
+
+    Args:
+        index (PodcastIndex): Client used to make the requests.
+        pairs (Iterable[Tuple]): (episode guid, feed) pairs, the feed being a feed id or a podcast guid.
+        by (str): "feedid" or "podcastguid", what the feed in each pair is. Default: "feedid"
+        min_group_size (int): Guids a feed needs before it is fetched whole. Default: 2
+        max_results (int): Episodes fetched per feed. Default: 1000
+        fulltext (bool): Return full text in the text fields. Default: False
+        workers (int): Requests made concurrently. Default: 4
+
+    Raises:
+        ValueError: If by is not "feedid" or "podcastguid".
+
+    Returns:
+        Dict[Tuple, Dict]: Episode for every pair, None where it could not be found.
+    """
+    if by not in ("feedid", "podcastguid"):
+        raise ValueError("by must be 'feedid' or 'podcastguid'")
+
+    groups = OrderedDict()
+    for guid, feed in pairs:
+        groups.setdefault(feed, []).append(guid)
+
+    results = {}
+    misses = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        bulk = [feed for feed, guids in groups.items() if len(set(guids)) >= min_group_size]
+        pages = executor.map(lambda feed: _fetch_feed_episodes(index, feed, by, max_results, fulltext), bulk)
+        for feed, by_guid in zip(bulk, pages):
+            for guid in groups[feed]:
+                if by_guid is None:
+                    results[(guid, feed)] = None
+                elif guid in by_guid:
+                    results[(guid, feed)] = by_guid[guid]
+                else:
+                    misses.append((guid, feed))
+
+        bulk = set(bulk)
+        misses.extend(
+            (guid, feed) for feed, guids in groups.items() if feed not in bulk for guid in guids
+        )
+        misses = list(OrderedDict.fromkeys(misses))
+        logger.debug(
+            "Resolved {} guids from {} feed pages, {} single lookups left".format(len(results), len(bulk), len(misses))
+        )
+
+        episodes = executor.map(lambda pair: _lookup_guid(index, pair[0], pair[1], by, fulltext), misses)
+        for pair, episode in zip(misses, episodes):
+            results[pair] = episode
+
+    return results
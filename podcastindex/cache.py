@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread safe, size bounded LRU cache whose entries expire after a time to live.
+
+    Expired entries are kept for a further stale_ttl seconds, during which lookup() still returns them
+    flagged as stale so callers can serve them while refreshing.
+
+    Args:
+        maxsize (int): Maximum number of entries. The least recently used entry is evicted first.
+        ttl (float): Default time to live of an entry, in seconds.
+        stale_ttl (float): Seconds an expired entry can still be served as stale. Default: 0
+    """
+
+    def __init__(self, maxsize, ttl, stale_ttl=0):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key, default=None):
+        """
+        Return the value for key if present and not expired, else default.
+        """
+        value, fresh = self.lookup(key)
+        return value if fresh else default
+
+    def lookup(self, key):
+        """
+        Return the value for key along with whether it is still fresh.
+
+        Returns:
+            Tuple[object, bool]: (value, True) for fresh entries, (value, False) for stale entries
+                within stale_ttl, and (None, False) when there is nothing usable.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None, False
+
+            expires_at, value = entry
+            if expires_at + self.stale_ttl <= now:
+                del self._data[key]
+                return None, False
+
+            self._data.move_to_end(key)
+            return value, expires_at > now
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key (str): Cache key.
+            value (object): Value to store. None can not be stored.
+            ttl (float, optional): Time to live in seconds. Defaults to the cache's ttl.
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Remove a single entry.
+
+        Returns:
+            bool: True if an entry was removed.
+        """
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Http status codes meaning a key is throttled or rejected
+QUARANTINE_STATUS_CODES = (401, 403, 429)
+
+
+class Credential:
+    """
+    An api key/secret pair along with its recent usage.
+    """
+
+    def __init__(self, api_key, api_secret):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.in_flight = 0
+        self.total = 0
+        self.failures = 0
+        self.quarantined_until = 0.0
+        self.recent = deque()
+
+    def load(self, now, window):
+        while self.recent and self.recent[0] <= now - window:
+            self.recent.popleft()
+        return self.in_flight + len(self.recent)
+
+
+class CredentialPool:
+    """
+    Spread requests over several api key/secret pairs.
+
+    Each request goes to the key with the fewest requests in flight plus requests made in the last
+    window seconds. Keys answered with 401, 403 or 429 are quarantined, for quarantine seconds doubling
+    on every consecutive failure up to max_quarantine.
+
+    Args:
+        credentials (List): Dicts with 'api_key' and 'api_secret' keys, or (key, secret) tuples.
+        window (float): Seconds of history used to compute a key's load. Default: 60
+        quarantine (float): Initial quarantine in seconds. Default: 30
+        max_quarantine (float): Longest quarantine in seconds. Default: 900
+
+    Raises:
+        ValueError: If no credentials are given.
+    """
+
+    def __init__(self, credentials, window=60, quarantine=30, max_quarantine=900):
+        self.credentials = []
+        for credential in credentials:
+            if isinstance(credential, dict):
+                self.credentials.append(Credential(credential["api_key"], credential["api_secret"]))
+            else:
+                self.credentials.append(Credential(*credential))
+        if not self.credentials:
+            raise ValueError("At least one credential is required")
+
+        self.window = window
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.credentials)
+
+    def acquire(self):
+        """
+        Pick the least loaded key that is not quarantined. When every key is quarantined, the one
+        released soonest is used.
+
+        Returns:
+            Credential: Key to sign the request with. Must be handed back with release().
+        """
+        now = time.time()
+        with self._lock:
+            available = [c for c in self.credentials if c.quarantined_until <= now]
+            if available:
+                credential = min(available, key=lambda c: c.load(now, self.window))
+            else:
+                credential = min(self.credentials, key=lambda c: c.quarantined_until)
+                logger.warning("All api keys are quarantined, using {}".format(credential.api_key))
+            credential.in_flight += 1
+            credential.total += 1
+            credential.recent.append(now)
+        return credential
+
+    def release(self, credential, status_code=None):
+        """
+        Hand back a key once its request finished.
+
+        Args:
+            credential (Credential): Key returned by acquire().
+            status_code (int, optional): Http status of the response, None if there was none.
+        """
+        with self._lock:
+            credential.in_flight -= 1
+            if status_code in QUARANTINE_STATUS_CODES:
+                credential.failures += 1
+                duration = min(self.quarantine * 2 ** (credential.failures - 1), self.max_quarantine)
+                credential.quarantined_until = time.time() + duration
+                logger.warning(
+                    "Api key {} got status {}, quarantined for {}s".format(credential.api_key, status_code, duration)
+                )
+            elif status_code is not None and status_code < 400:
+                credential.failures = 0
+
+    def stats(self):
+        """
+        Usage of every key.
+
+        Returns:
+            Dict[str, Dict]: Load, in flight, total and quarantine state keyed by api key.
+        """
+        now = time.time()
+        with self._lock:
+            return dict(
+                (
+                    c.api_key,
+                    {
+                        "load": c.load(now, self.window),
+                        "in_flight": c.in_flight,
+                        "total": c.total,
+                        "quarantined": c.quarantined_until > now,
+                    },
+                )
+                for c in self.credentials
+            )
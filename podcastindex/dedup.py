@@ -0,0 +1,376 @@
+import array
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PIDEDUP1"
+
+
+def fingerprint(key):
+    """
+    Hash a key down to a non zero 64 bit integer.
+
+    Args:
+        key (str): Key to hash.
+
+    Returns:
+        int: 64 bit fingerprint.
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return struct.unpack("<Q", digest)[0] or 1
+
+
+def episode_keys(episode):
+    """
+    Build the dedup keys identifying an episode: its id, its guid (scoped to the feed, since guids are
+    only unique within a feed) and its enclosure url.
+
+    Args:
+        episode (Dict): Episode as returned by the api.
+
+    Returns:
+        List[str]: Keys for the episode, possibly empty.
+    """
+    keys = []
+    if episode.get("id"):
+        keys.append("i:{}".format(episode["id"]))
+    if episode.get("guid"):
+        keys.append("g:{}:{}".format(episode.get("feedId", ""), episode["guid"]))
+    if episode.get("enclosureUrl"):
+        keys.append("u:{}".format(episode["enclosureUrl"]))
+    return keys
+
+
+class FingerprintSet:
+    """
+    Open addressing hash set of 64 bit fingerprints stored in a flat array, using 8 bytes per slot
+    instead of the ~70 bytes a python set of strings needs per key.
+
+    Args:
+        capacity (int): Number of keys to size the table for. It grows as needed. Default: 1024
+    """
+
+    def __init__(self, capacity=1024):
+        slots = 16
+        while slots < capacity * 2:
+            slots *= 2
+        self._slots = array.array("Q", bytes(8 * slots))
+        self._mask = slots - 1
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, fp):
+        slots = self._slots
+        mask = self._mask
+        i = fp & mask
+        while True:
+            value = slots[i]
+            if value == fp:
+                return True
+            if value == 0:
+                return False
+            i = (i + 1) & mask
+
+    def add(self, fp):
+        """
+        Add a fingerprint.
+
+        Args:
+            fp (int): Non zero 64 bit fingerprint.
+
+        Returns:
+            bool: True if the fingerprint was not already present.
+        """
+        if (self._count + 1) * 2 > len(self._slots):
+            self._resize(len(self._slots) * 2)
+
+        slots = self._slots
+        mask = self._mask
+        i = fp & mask
+        while True:
+            value = slots[i]
+            if value == fp:
+                return False
+            if value == 0:
+                slots[i] = fp
+                self._count += 1
+                return True
+            i = (i + 1) & mask
+
+    def clear(self):
+        self._slots = array.array("Q", bytes(8 * 16))
+        self._mask = 15
+        self._count = 0
+
+    @property
+    def nbytes(self):
+        return len(self._slots) * 8
+
+    def _resize(self, slots):
+        old = self._slots
+        self._slots = array.array("Q", bytes(8 * slots))
+        self._mask = slots - 1
+        self._count = 0
+        for fp in old:
+            if fp:
+                self.add(fp)
+
+    def to_bytes(self):
+        return self._slots.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data, count):
+        fps = cls.__new__(cls)
+        fps._slots = array.array("Q")
+        fps._slots.frombytes(data)
+        fps._mask = len(fps._slots) - 1
+        fps._count = count
+        return fps
+
+
+class BloomFilter:
+    """
+    Fixed size Bloom filter. Membership tests may return false positives at roughly error_rate once
+    capacity keys have been added, but never false negatives.
+
+    Args:
+        capacity (int): Expected number of keys.
+        error_rate (float): Target false positive rate at capacity. Default: 0.001
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        num_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_bits = max(8, num_bits)
+        self.num_hashes = max(1, int(round(self.num_bits / float(capacity) * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, fp):
+        # Kirsch-Mitzenmacher double hashing from the two halves of a mixed fingerprint
+        h1 = fp & 0xFFFFFFFF
+        h2 = (fp >> 32) | 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, fp):
+        bits = self._bits
+        for pos in self._positions(fp):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, fp):
+        """
+        Add a fingerprint.
+
+        Args:
+            fp (int): 64 bit fingerprint.
+
+        Returns:
+            bool: True if the fingerprint was (probably) not already present.
+        """
+        bits = self._bits
+        added = False
+        for pos in self._positions(fp):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    @property
+    def nbytes(self):
+        return len(self._bits)
+
+    @classmethod
+    def from_bytes(cls, data, num_bits, num_hashes, count):
+        bloom = cls.__new__(cls)
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.count = count
+        bloom._bits = bytearray(data)
+        return bloom
+
+
+class EpisodeDeduplicator:
+    """
+    Remember which episodes have been seen, by id, feed scoped guid and enclosure url.
+
+    Recent keys are held exactly in a FingerprintSet. For very large histories pass bloom_capacity:
+    every key is then also recorded in a Bloom filter, and the exact set is emptied whenever it
+    reaches max_exact_keys, which bounds memory at the cost of a small false positive rate for old
+    keys.
+
+    Args:
+        max_exact_keys (int, optional): Size at which the exact set is emptied. Requires bloom_capacity.
+        bloom_capacity (int, optional): Expected number of historical keys, e.g. 100_000_000.
+        error_rate (float): Bloom filter false positive rate at capacity. Default: 0.001
+
+    Raises:
+        ValueError: If max_exact_keys is given without bloom_capacity.
+    """
+
+    def __init__(self, max_exact_keys=None, bloom_capacity=None, error_rate=0.001):
+        if max_exact_keys is not None and bloom_capacity is None:
+            raise ValueError("max_exact_keys requires bloom_capacity, or old keys would be forgotten")
+
+        self.max_exact_keys = max_exact_keys
+        self._exact = FingerprintSet()
+        self._bloom = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        if self._bloom is not None:
+            return self._bloom.count
+        return len(self._exact)
+
+    @property
+    def nbytes(self):
+        """
+        int: Approximate memory used by the key storage.
+        """
+        total = self._exact.nbytes
+        if self._bloom is not None:
+            total += self._bloom.nbytes
+        return total
+
+    def _seen(self, fp):
+        return fp in self._exact or (self._bloom is not None and fp in self._bloom)
+
+    def _add(self, fp):
+        if self.max_exact_keys is not None and len(self._exact) >= self.max_exact_keys:
+            logger.debug("Exact dedup set full, relying on the bloom filter for older keys")
+            self._exact.clear()
+        self._exact.add(fp)
+        if self._bloom is not None:
+            self._bloom.add(fp)
+
+    def seen_key(self, key):
+        """
+        Check a raw key, e.g. "u:<enclosure url>", without recording it.
+        """
+        with self._lock:
+            return self._seen(fingerprint(key))
+
+    def seen(self, episode):
+        """
+        Check whether any of the episode's keys have been recorded, without recording it.
+
+        Args:
+            episode (Dict): Episode as returned by the api.
+
+        Returns:
+            bool: True if the episode (probably) has been seen before.
+        """
+        fps = [fingerprint(key) for key in episode_keys(episode)]
+        with self._lock:
+            return any(self._seen(fp) for fp in fps)
+
+    def add(self, episode):
+        """
+        Check an episode and record all of its keys.
+
+        Args:
+            episode (Dict): Episode as returned by the api.
+
+        Returns:
+            bool: True if the episode is new, False if it was seen before.
+        """
+        fps = [fingerprint(key) for key in episode_keys(episode)]
+        with self._lock:
+            new = not any(self._seen(fp) for fp in fps)
+            for fp in fps:
+                self._add(fp)
+        return new
+
+    def filter(self, episodes):
+        """
+        Drop already seen episodes from a stream, recording the new ones.
+
+        Args:
+            episodes (Iterable[Dict]): Episodes, e.g. from paginate_recent_episodes.
+
+        Returns:
+            Iterator[Dict]: Episodes not seen before.
+        """
+        for episode in episodes:
+            if self.add(episode):
+                yield episode
+
+    def save(self, path):
+        """
+        Persist the deduplicator to disk. The file is replaced atomically.
+
+        Args:
+            path (str): File to write.
+        """
+        with self._lock:
+            header = {
+                "max_exact_keys": self.max_exact_keys,
+                "exact_count": len(self._exact),
+                "exact_bytes": self._exact.nbytes,
+            }
+            if self._bloom is not None:
+                header["bloom"] = {
+                    "num_bits": self._bloom.num_bits,
+                    "num_hashes": self._bloom.num_hashes,
+                    "count": self._bloom.count,
+                }
+            header_bytes = json.dumps(header).encode("utf-8")
+
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_MAGIC)
+                f.write(struct.pack("<I", len(header_bytes)))
+                f.write(header_bytes)
+                f.write(self._exact.to_bytes())
+                if self._bloom is not None:
+                    f.write(self._bloom._bits)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a deduplicator written by save().
+
+        Args:
+            path (str): File to read.
+
+        Raises:
+            ValueError: If the file is not a saved deduplicator.
+
+        Returns:
+            EpisodeDeduplicator: The restored deduplicator.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("{} is not a saved EpisodeDeduplicator".format(path))
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+            dedup = cls.__new__(cls)
+            dedup.max_exact_keys = header["max_exact_keys"]
+            dedup._lock = threading.Lock()
+            dedup._exact = FingerprintSet.from_bytes(f.read(header["exact_bytes"]), header["exact_count"])
+            dedup._bloom = None
+            if "bloom" in header:
+                bloom = header["bloom"]
+                dedup._bloom = BloomFilter.from_bytes(
+                    f.read((bloom["num_bits"] + 7) // 8), bloom["num_bits"], bloom["num_hashes"], bloom["count"]
+                )
+        return dedup
@@ -0,0 +1,201 @@
+def _csv(values):
+    try:
+        # Lists of language codes and category names are usually strings already
+        return ",".join(values)
+    except TypeError:
+        return ",".join(map(str, values))
+
+
+class Param:
+    """
+    How one method argument maps onto the request payload. An endpoint lists its params in the order of the
+    method's arguments.
+
+    Args:
+        arg (str): Name of the PodcastIndex method argument.
+        key (str, optional): Payload key. Defaults to arg.
+        encode (callable, optional): Applied to the value before it goes into the payload.
+        value (object, optional): Constant sent in place of the argument, e.g. 1 for boolean flags.
+        required (bool): Always send the value. Otherwise it is only sent when truthy. Default: False
+    """
+
+    def __init__(self, arg, key=None, encode=None, value=None, required=False):
+        self.arg = arg
+        self.key = key or arg
+        self.encode = encode
+        self.value = value
+        self.required = required
+
+
+class Endpoint:
+    """
+    Description of an api endpoint, with a payload builder prepared once.
+
+    Args:
+        name (str): Name of the PodcastIndex method calling the endpoint.
+        path (str): Path below the api base url.
+        params (List[Param]): Payload parameters, in the order of the method's arguments.
+        constants (Dict, optional): Payload entries sent with every request.
+        cacheable (bool): Responses may be served from the response cache. Default: True
+        negative_cacheable (bool): "Not found" responses may be remembered. Default: False
+        idempotent (bool): Repeating the request has no side effects. Default: True
+    """
+
+    def __init__(
+        self, name, path, params=(), constants=None, cacheable=True, negative_cacheable=False, idempotent=True
+    ):
+        self.name = name
+        self.path = path
+        self.params = tuple(params)
+        self.constants = dict(constants or {})
+        self.cacheable = cacheable
+        self.negative_cacheable = negative_cacheable
+        self.idempotent = idempotent
+
+        self.build_payload = self._payload_builder()
+
+        # Every key the payload can contain, sorted once for cache keys
+        self._sorted_keys = tuple(sorted(set(self.constants) | set(p.key for p in self.params)))
+
+    def cache_key(self, url, payload):
+        """
+        Build a cache key for a request that does not depend on the order of the payload.
+
+        Args:
+            url (str): Request url.
+            payload (Dict): Request payload built by build_payload.
+
+        Returns:
+            str: Cache key.
+        """
+        return url + "?" + "&".join(["{}={}".format(k, payload[k]) for k in self._sorted_keys if k in payload])
+
+    def _payload_builder(self):
+        """
+        Build a function taking the method's arguments positionally and returning the payload. Everything
+        that does not depend on the arguments is worked out here, once.
+        """
+        constants = self.constants
+        required = tuple((i, p.key) for i, p in enumerate(self.params) if p.required)
+        optional = tuple((i, p.key, p.value, p.encode) for i, p in enumerate(self.params) if not p.required)
+
+        def build_payload(*args):
+            payload = constants.copy()
+            for i, key in required:
+                payload[key] = args[i]
+            for i, key, value, encode in optional:
+                arg = args[i]
+                if arg:
+                    if value is not None:
+                        arg = value
+                    elif encode is not None:
+                        arg = encode(arg)
+                    payload[key] = arg
+            return payload
+
+        build_payload.__doc__ = "Build the {} payload from the method arguments.".format(self.path)
+        return build_payload
+
+
+_EPISODE_LIST_PARAMS = (
+    Param("since"),
+    Param("max_results", "max", required=True),
+    Param("fulltext", value=True),
+    Param("enclosure"),
+)
+
+_FEED_LIST_PARAMS = (
+    Param("max"),
+    Param("since"),
+    Param("lang", encode=_csv),
+    Param("categories", "cat", encode=_csv),
+    Param("not_categories", "notcat", encode=_csv),
+)
+
+# Every endpoint the client knows about, keyed by the name of its PodcastIndex method
+ENDPOINTS = dict(
+    (endpoint.name, endpoint)
+    for endpoint in (
+        Endpoint("search", "/search/byterm", [Param("query", "q", required=True), Param("clean", value=1)]),
+        Endpoint(
+            "episodesByPerson",
+            "/search/byperson",
+            [Param("query", "q", required=True), Param("clean", value=1), Param("fulltext", value=True)],
+        ),
+        Endpoint(
+            "podcastByFeedUrl", "/podcasts/byfeedurl", [Param("feedUrl", "url", required=True)],
+            negative_cacheable=True,
+        ),
+        Endpoint(
+            "podcastByFeedId", "/podcasts/byfeedid", [Param("feedId", "id", required=True)],
+            negative_cacheable=True,
+        ),
+        Endpoint(
+            "podcastByItunesId", "/podcasts/byitunesid", [Param("itunesId", "id", required=True)],
+            negative_cacheable=True,
+        ),
+        Endpoint(
+            "podcastByGuid", "/podcasts/byguid", [Param("guid", required=True)],
+            negative_cacheable=True,
+        ),
+        Endpoint(
+            "episodesByFeedUrl",
+            "/episodes/byfeedurl",
+            [Param("feedUrl", "url", required=True), Param("since"), Param("max_results", "max", required=True),
+             Param("fulltext", value=True)],
+        ),
+        Endpoint(
+            "episodesByFeedId", "/episodes/byfeedid", (Param("feedId", "id", required=True),) + _EPISODE_LIST_PARAMS
+        ),
+        Endpoint(
+            "episodesByItunesId",
+            "/episodes/byitunesid",
+            (Param("itunesId", "id", required=True),) + _EPISODE_LIST_PARAMS,
+            constants={"fulltext": True},
+        ),
+        Endpoint(
+            "episodesByPodcastGuid",
+            "/episodes/bypodcastguid",
+            (Param("podcastGuid", "guid", required=True),) + _EPISODE_LIST_PARAMS,
+        ),
+        Endpoint(
+            "episodeById", "/episodes/byid", [Param("id", required=True), Param("fulltext", value=True)],
+            negative_cacheable=True,
+        ),
+        Endpoint(
+            "episodeByGuid",
+            "/episodes/byguid",
+            [Param("guid", required=True), Param("feedurl"), Param("feedid"), Param("podcastguid"),
+             Param("fulltext", value=True)],
+            negative_cacheable=True,
+        ),
+        Endpoint(
+            "randomEpisodes",
+            "/episodes/random",
+            [Param("max"), Param("lang"), Param("cat"), Param("notcat"), Param("fulltext", value=True)],
+            constants={"pretty": 1},
+            cacheable=False,
+        ),
+        Endpoint(
+            "recentEpisodes",
+            "/recent/episodes",
+            [Param("max"), Param("excluding", "excludeString"), Param("before_episode_id", "before"),
+             Param("fulltext", value=True)],
+        ),
+        Endpoint("recentFeeds", "/recent/feeds", _FEED_LIST_PARAMS),
+        Endpoint(
+            "newFeeds",
+            "/recent/feeds",
+            [Param("max"), Param("since"), Param("feed_id", "feedid"), Param("desc")],
+        ),
+        Endpoint("trendingPodcasts", "/podcasts/trending", _FEED_LIST_PARAMS),
+        Endpoint(
+            "addByItunesId", "/add/byitunesid", [Param("itunesId", "id", required=True)],
+            constants={"pretty": 1}, cacheable=False, idempotent=False,
+        ),
+        Endpoint(
+            "pubNotifyUpdate", "/hub/pubnotify", [Param("id", required=True)],
+            constants={"pretty": 1}, cacheable=False, idempotent=False,
+        ),
+    )
+)
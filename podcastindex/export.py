@@ -0,0 +1,303 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Keys under which the api returns lists of results
+RESULT_LIST_KEYS = ("items", "feeds", "episodes")
+
+# Keys under which the api returns a single result
+RESULT_OBJECT_KEYS = ("episode", "feed")
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+_SENTINEL = object()
+
+
+def iter_results(response):
+    """
+    Yield the individual feeds or episodes contained in an api response.
+
+    Args:
+        response (Dict): API response as returned by any PodcastIndex method.
+
+    Returns:
+        Iterator[Dict]: The feeds or episodes in the response, in order.
+    """
+    for key in RESULT_LIST_KEYS:
+        if isinstance(response.get(key), list):
+            for item in response[key]:
+                yield item
+            return
+
+    for key in RESULT_OBJECT_KEYS:
+        if isinstance(response.get(key), dict) and response[key]:
+            yield response[key]
+            return
+
+
+def stream_items(method, *args, **kwargs):
+    """
+    Call any PodcastIndex method and yield the items of its response.
+
+    Args:
+        method (callable): Bound PodcastIndex method, e.g. index.recentFeeds
+        *args: Positional arguments for the method.
+        **kwargs: Keyword arguments for the method.
+
+    Returns:
+        Iterator[Dict]: The feeds or episodes in the response.
+    """
+    return iter_results(method(*args, **kwargs))
+
+
+def paginate_recent_episodes(index, max=1000, excluding=None, fulltext=False, limit=None):
+    """
+    Walk back through the global episode history using recentEpisodes, one page at a time.
+
+    Args:
+        index (PodcastIndex): Client used to make the requests.
+        max (int): Page size. Default: 1000
+        excluding (str, optional): Passed through to recentEpisodes.
+        fulltext (bool): Return full text in the text fields. Default: False
+        limit (int, optional): Stop after yielding this many episodes.
+
+    Returns:
+        Iterator[Dict]: Episodes in reverse chronological order.
+    """
+    before_episode_id = None
+    count = 0
+    while True:
+        result = index.recentEpisodes(
+            max=max,
+            excluding=excluding,
+            before_episode_id=before_episode_id,
+            fulltext=fulltext,
+        )
+        items = result.get("items") or []
+        if not items:
+            return
+
+        for item in items:
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+        oldest_id = min(item["id"] for item in items)
+        if before_episode_id is not None and oldest_id >= before_episode_id:
+            # The api did not move backwards, avoid looping forever
+            return
+        before_episode_id = oldest_id
+
+
+def _open_compressed(path, compression, level):
+    if compression is None:
+        return open(path, "wb")
+
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6 if level is None else level)
+
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+        return compressor.stream_writer(open(path, "wb"))
+
+    raise ValueError("Unknown compression: {}".format(compression))
+
+
+class NDJSONWriter:
+    """
+    Write api items to newline delimited json files from a background thread.
+
+    Items handed to write() are queued on a bounded queue, so a producer that outruns the disk
+    blocks instead of growing memory. Serialization, compression and file rotation all happen on
+    the writer thread.
+
+    Args:
+        path (str): Output path, e.g. "dump/recent.ndjson". When rotating, a part number is
+            inserted before the extension ("dump/recent.00000.ndjson"). The compression suffix is
+            appended automatically.
+        compression (str, optional): None, "gzip" or "zstd". Default: None
+        level (int, optional): Compression level.
+        max_bytes (int, optional): Rotate to a new file once this many uncompressed bytes have
+            been written to the current one.
+        queue_size (int): Maximum number of items waiting to be written. Default: 1024
+        batch_size (int): Maximum number of lines joined into a single write. Default: 256
+    """
+
+    def __init__(
+        self, path, compression=None, level=None, max_bytes=None, queue_size=1024, batch_size=256
+    ):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError("Unknown compression: {}".format(compression))
+
+        self.path = path
+        self.compression = compression
+        self.level = level
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+
+        self.files = []
+        self.items_written = 0
+        self.bytes_written = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self._file = None
+        self._file_bytes = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._thread = threading.Thread(target=self._run, name="ndjson-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, item):
+        """
+        Queue a single item for writing. Blocks while the queue is full.
+
+        Args:
+            item (Dict): JSON serializable item.
+
+        Raises:
+            RuntimeError: If the writer is closed.
+        """
+        self._raise_error()
+        if self._closed:
+            raise RuntimeError("NDJSONWriter is closed")
+        self._queue.put(item)
+
+    def write_all(self, items):
+        """
+        Queue every item from an iterable.
+
+        Args:
+            items (Iterable[Dict]): JSON serializable items.
+
+        Returns:
+            int: Number of items queued.
+        """
+        count = 0
+        for item in items:
+            self.write(item)
+            count += 1
+        return count
+
+    def close(self):
+        """
+        Flush all queued items, close the current file and stop the writer thread.
+
+        Raises:
+            Exception: Any error raised while serializing or writing.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_SENTINEL)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _part_path(self):
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        if self.max_bytes is None:
+            return self.path + suffix
+
+        root, ext = os.path.splitext(self.path)
+        return "{}.{:05d}{}{}".format(root, len(self.files), ext, suffix)
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        path = self._part_path()
+        self._file = _open_compressed(path, self.compression, self.level)
+        self._file_bytes = 0
+        self.files.append(path)
+        logger.debug("Writing items to {}".format(path))
+
+    def _flush(self, lines):
+        data = "".join(lines).encode("utf-8")
+        if self._file is None or (self.max_bytes is not None and self._file_bytes >= self.max_bytes):
+            self._rotate()
+        self._file.write(data)
+        self._file_bytes += len(data)
+        self.bytes_written += len(data)
+        self.items_written += len(lines)
+
+    def _run(self):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        done = False
+        while not done:
+            item = self._queue.get()
+            lines = []
+            pending = 0
+            while True:
+                if item is _SENTINEL:
+                    done = True
+                    break
+                if self._error is None:
+                    try:
+                        line = dumps(item) + "\n"
+                        lines.append(line)
+                        pending += len(line)
+                    except Exception as e:
+                        self._error = e
+                if len(lines) >= self.batch_size or (
+                    self.max_bytes is not None
+                    and self._file_bytes + pending >= self.max_bytes
+                ):
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if lines and self._error is None:
+                try:
+                    self._flush(lines)
+                except Exception as e:
+                    self._error = e
+
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+            self._file = None
+
+
+def export(items, path, **kwargs):
+    """
+    Stream items into NDJSON file(s).
+
+    Args:
+        items (Iterable[Dict]): Items to export, e.g. stream_items(index.recentFeeds, max=1000)
+        path (str): Output path, see NDJSONWriter.
+        **kwargs: Passed through to NDJSONWriter.
+
+    Returns:
+        List[str]: Paths of the files written.
+    """
+    with NDJSONWriter(path, **kwargs) as writer:
+        writer.write_all(items)
+    return writer.files
@@ -0,0 +1,131 @@
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import requests
+
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Cached in place of feeds that do not exist, since the cache can not hold None
+_MISSING = object()
+
+
+class FeedHydrator:
+    """
+    Attach full feed records to episodes, fetching each distinct feed once.
+
+    The feedId values of a batch of episodes are collected, feeds not already cached are fetched
+    concurrently with podcastByFeedId, and each episode gets its feed under the attribute given by key
+    (None when the feed does not exist). Feeds stay cached across batches, so a stream of N episodes costs
+    about one request per unique feed. Every episode gets its own copy of the feed, so changing it does not
+    affect other episodes or the cache.
+
+    Args:
+        index (PodcastIndex): Client used to fetch the feeds.
+        workers (int): Feeds fetched concurrently. Default: 8
+        cache_size (int): Feeds kept in the cache. Default: 10000
+        cache_ttl (float): Seconds a cached feed is reused. Default: 3600
+        key (str): Episode attribute the feed is stored under. Default: "feed"
+
+    Example:
+        hydrator = FeedHydrator(index)
+        episodes = hydrator.hydrate(index.recentEpisodes(max=100)["items"])
+        episodes[0]["feed"]["title"]
+    """
+
+    def __init__(self, index, workers=8, cache_size=10000, cache_ttl=3600, key="feed"):
+        self.index = index
+        self.key = key
+        self.requests = 0
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def _fetch(self, feed_id):
+        try:
+            result = self.index.podcastByFeedId(feed_id)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code in (400, 404):
+                return None
+            raise
+        # Unknown feeds come back as an empty list
+        return result.get("feed") or None
+
+    def feeds(self, feed_ids):
+        """
+        Look up feeds by id, from the cache where possible.
+
+        Args:
+            feed_ids (Iterable): Feed ids, duplicates allowed.
+
+        Returns:
+            Dict: Copy of the feed for every distinct id, None where it does not exist.
+        """
+        return copy.deepcopy(self._lookup(feed_ids))
+
+    def _lookup(self, feed_ids):
+        # The feeds returned are the cached objects themselves
+        feeds = {}
+        missing = []
+        for feed_id in feed_ids:
+            if feed_id in feeds:
+                continue
+            feed = self.cache.get(feed_id)
+            if feed is None:
+                missing.append(feed_id)
+                feeds[feed_id] = None
+            else:
+                feeds[feed_id] = None if feed is _MISSING else feed
+
+        if missing:
+            self.requests += len(missing)
+            for feed_id, feed in zip(missing, self._executor.map(self._fetch, missing)):
+                self.cache.set(feed_id, _MISSING if feed is None else feed)
+                feeds[feed_id] = feed
+            logger.debug("Hydrated {} feeds, {} from the cache".format(len(feeds), len(feeds) - len(missing)))
+        return feeds
+
+    def hydrate(self, episodes):
+        """
+        Attach feeds to a batch of episodes, in place.
+
+        Args:
+            episodes (List[Dict]): Episodes with a feedId, e.g. the items of recentEpisodes.
+
+        Returns:
+            List[Dict]: The same episodes.
+        """
+        feeds = self._lookup(episode["feedId"] for episode in episodes if episode.get("feedId") is not None)
+        for episode in episodes:
+            episode[self.key] = copy.deepcopy(feeds.get(episode.get("feedId")))
+        return episodes
+
+    def hydrate_stream(self, episodes, batch_size=100):
+        """
+        Attach feeds to a stream of episodes, batch_size episodes at a time.
+
+        Args:
+            episodes (Iterable[Dict]): Episodes with a feedId, e.g. from stream_items().
+            batch_size (int): Episodes collected before their feeds are fetched. Default: 100
+
+        Yields:
+            Dict: Episodes with their feed attached, in order.
+        """
+        episodes = iter(episodes)
+        while True:
+            batch = list(islice(episodes, batch_size))
+            if not batch:
+                return
+            for episode in self.hydrate(batch):
+                yield episode
@@ -0,0 +1,412 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+from .scheduler import BULK
+
+logger = logging.getLogger(__name__)
+
+# Episode fields stored compressed, and only decompressed when read
+TEXT_FIELDS = ("title", "description")
+
+DATA_FILE = "episodes.dat"
+INDEX_FILE = "episodes.idx"
+DICTIONARY_FILE = "zstd.dict"
+
+# Index entry: episode id, feed id, datePublished, offset and length of the record, crc of the episode
+_ENTRY = struct.Struct("<qqqQII")
+# Record header: codec of the text fields, length of the metadata
+_HEADER = struct.Struct("<BI")
+
+RAW, ZLIB, ZSTD, ZSTD_DICT = 0, 1, 2, 3
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd compression requires the 'zstandard' package")
+    return zstandard
+
+
+def _checksum(episode):
+    return zlib.crc32(json.dumps(episode, sort_keys=True).encode("utf-8")) & 0xFFFFFFFF
+
+
+class MirroredEpisode(Mapping):
+    """
+    Read only episode from an EpisodeMirror. The compressed text fields are decompressed on first access.
+    """
+
+    def __init__(self, mirror, fields, text_keys, codec, blob):
+        self._mirror = mirror
+        self._fields = fields
+        self._text_keys = text_keys
+        self._codec = codec
+        self._blob = blob
+        self._text = None
+
+    def _load_text(self):
+        if self._text is None:
+            self._text = json.loads(self._mirror._decompress(self._codec, self._blob).decode("utf-8"))
+            self._blob = None
+        return self._text
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return self._fields[key]
+        if key in self._text_keys:
+            return self._load_text()[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self._fields:
+            yield key
+        for key in self._text_keys:
+            yield key
+
+    def __len__(self):
+        return len(self._fields) + len(self._text_keys)
+
+    def __repr__(self):
+        return "MirroredEpisode(id={})".format(self._fields.get("id"))
+
+
+class EpisodeMirror:
+    """
+    Local copy of the episodes of a set of feeds, kept up to date with incremental syncs.
+
+    Episodes are appended to a data file and read back through a memory map, with an index of where each
+    one lives. Text fields (title and description by default) are compressed, with zstd when the
+    'zstandard' package is installed and zlib otherwise. With zstd, a dictionary is trained once
+    train_after episodes have been stored, which compresses short descriptions much better. Merging an
+    episode that is already stored unchanged writes nothing, so syncs only move new or updated data.
+
+    Args:
+        path (str): Directory holding the mirror, created if needed.
+        compression (str): "auto", "zstd", "zlib" or None. "auto" uses zstd when available. Default: "auto"
+        level (int, optional): Compression level.
+        text_fields (Tuple[str]): Fields stored compressed. Default: ("title", "description")
+        train_after (int): Episodes to collect before training a zstd dictionary, 0 to never train.
+            Default: 1000
+        dictionary_size (int): Size of the trained dictionary in bytes. Default: 65536
+
+    Example:
+        mirror = EpisodeMirror("mirror")
+        mirror.sync(index, feed_ids)
+        for episode in mirror.episodes(feedId):
+            print(episode["datePublished"], episode["title"])
+    """
+
+    def __init__(
+        self, path, compression="auto", level=None, text_fields=TEXT_FIELDS, train_after=1000, dictionary_size=65536
+    ):
+        if compression == "auto":
+            try:
+                _zstandard()
+                compression = "zstd"
+            except ImportError:
+                compression = "zlib"
+        if compression not in ("zstd", "zlib", None):
+            raise ValueError("Unknown compression: {}".format(compression))
+        if compression == "zstd":
+            _zstandard()
+
+        self.path = path
+        self.compression = compression
+        self.level = level
+        self.text_fields = tuple(text_fields)
+        self.train_after = train_after
+        self.dictionary_size = dictionary_size
+
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._entries = {}
+        self._by_feed = {}
+        self._latest = {}
+        self._samples = []
+        self._dictionary = None
+        self._map = None
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        dictionary_path = os.path.join(path, DICTIONARY_FILE)
+        if os.path.exists(dictionary_path):
+            with open(dictionary_path, "rb") as f:
+                self._dictionary = f.read()
+        self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, episode_id):
+        return episode_id in self._entries
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._reader.close()
+            self._data.close()
+            self._index.close()
+
+    def _open(self):
+        data_path = os.path.join(self.path, DATA_FILE)
+        index_path = os.path.join(self.path, INDEX_FILE)
+        self._data = open(data_path, "ab")
+        self._index = open(index_path, "ab")
+        self._reader = open(data_path, "rb")
+
+        self._entries.clear()
+        self._by_feed.clear()
+        self._latest.clear()
+        data_size = os.path.getsize(data_path)
+        with open(index_path, "rb") as f:
+            raw = f.read()
+        # A partially written last entry, or one whose record never made it to disk, is ignored
+        usable = len(raw) - len(raw) % _ENTRY.size
+        for entry in _ENTRY.iter_unpack(raw[:usable]):
+            if entry[3] + entry[4] <= data_size:
+                self._remember(entry)
+        logger.debug("Opened mirror {} with {} episodes".format(self.path, len(self._entries)))
+
+    def _remember(self, entry):
+        episode_id, feed_id, published = entry[:3]
+        previous = self._entries.get(episode_id)
+        if previous is not None and previous[1] != feed_id:
+            self._by_feed[previous[1]].discard(episode_id)
+        self._entries[episode_id] = entry
+        self._by_feed.setdefault(feed_id, set()).add(episode_id)
+        if published > self._latest.get(feed_id, 0):
+            self._latest[feed_id] = published
+
+    def _compressor(self):
+        if self.compression == "zlib":
+            return ZLIB, lambda data: zlib.compress(data, 6 if self.level is None else self.level)
+        if self.compression == "zstd":
+            zstandard = _zstandard()
+            level = 3 if self.level is None else self.level
+            if self._dictionary is not None:
+                dictionary = zstandard.ZstdCompressionDict(self._dictionary)
+                return ZSTD_DICT, zstandard.ZstdCompressor(level=level, dict_data=dictionary).compress
+            return ZSTD, zstandard.ZstdCompressor(level=level).compress
+        return RAW, bytes
+
+    def _decompress(self, codec, blob):
+        if codec == RAW:
+            return blob
+        if codec == ZLIB:
+            return zlib.decompress(blob)
+        # Decompressors are not thread safe and loading the dictionary is not free, so keep one per thread
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        if codec not in decompressors:
+            zstandard = _zstandard()
+            if codec == ZSTD_DICT:
+                dictionary = zstandard.ZstdCompressionDict(self._dictionary)
+                decompressors[codec] = zstandard.ZstdDecompressor(dict_data=dictionary)
+            else:
+                decompressors[codec] = zstandard.ZstdDecompressor()
+        return decompressors[codec].decompress(blob)
+
+    def train_dictionary(self, samples=None):
+        """
+        Train the zstd dictionary used for episodes stored from now on. A mirror has at most one dictionary,
+        since the episodes compressed with it need it to be read.
+
+        Args:
+            samples (List[bytes], optional): Serialized text fields to train on. Defaults to those collected
+                from recently merged episodes.
+
+        Raises:
+            RuntimeError: If the mirror already has a dictionary.
+        """
+        zstandard = _zstandard()
+        samples = samples if samples is not None else self._samples
+        with self._lock:
+            if self._dictionary is not None:
+                raise RuntimeError("The mirror already has a zstd dictionary")
+            dictionary = zstandard.train_dictionary(self.dictionary_size, samples).as_bytes()
+            tmp_path = os.path.join(self.path, DICTIONARY_FILE + ".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(dictionary)
+            os.replace(tmp_path, os.path.join(self.path, DICTIONARY_FILE))
+            self._dictionary = dictionary
+            self._samples = []
+            self._local = threading.local()
+        logger.info("Trained a {} byte zstd dictionary on {} episodes".format(len(dictionary), len(samples)))
+
+    def _encode(self, episode, codec, compress):
+        fields = dict((key, value) for key, value in episode.items() if key not in self.text_fields)
+        text = dict((key, episode[key]) for key in self.text_fields if key in episode)
+        meta = json.dumps([fields, list(text)], separators=(",", ":")).encode("utf-8")
+        blob = json.dumps(text, separators=(",", ":")).encode("utf-8")
+        if self.compression == "zstd" and self._dictionary is None and len(self._samples) < self.train_after:
+            self._samples.append(blob)
+        return _HEADER.pack(codec, len(meta)) + meta + compress(blob)
+
+    def merge(self, episodes):
+        """
+        Store new and updated episodes. Episodes already stored with the same content are skipped.
+
+        Args:
+            episodes (Iterable[Dict]): Episodes as returned by the api, with an id and feedId.
+
+        Returns:
+            Tuple[int, int]: Number of episodes written and number skipped as unchanged.
+        """
+        written = unchanged = 0
+        with self._lock:
+            codec, compress = self._compressor()
+            offset = self._data.tell()
+            records = []
+            entries = []
+            for episode in episodes:
+                crc = _checksum(episode)
+                previous = self._entries.get(episode["id"])
+                if previous is not None and previous[5] == crc:
+                    unchanged += 1
+                    continue
+                record = self._encode(episode, codec, compress)
+                entry = (
+                    episode["id"], episode.get("feedId") or 0, episode.get("datePublished") or 0,
+                    offset, len(record), crc,
+                )
+                records.append(record)
+                entries.append(entry)
+                offset += len(record)
+                self._remember(entry)
+                written += 1
+
+            if records:
+                # Records reach the disk before the index entries pointing at them
+                self._data.write(b"".join(records))
+                self._data.flush()
+                self._index.write(b"".join(_ENTRY.pack(*entry) for entry in entries))
+                self._index.flush()
+
+            if self._samples and len(self._samples) >= self.train_after:
+                try:
+                    self.train_dictionary()
+                except Exception as e:
+                    logger.warning("Could not train a zstd dictionary, storing without one: {}".format(e))
+                    self._samples = []
+                    self.train_after = 0
+        return written, unchanged
+
+    def _raw(self, entry):
+        offset, length = entry[3], entry[4]
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                # The data file grew since it was mapped
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._reader.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[offset:offset + length]
+
+    def _record(self, entry):
+        record = self._raw(entry)
+        codec, meta_length = _HEADER.unpack_from(record)
+        start = _HEADER.size
+        fields, text_keys = json.loads(record[start:start + meta_length].decode("utf-8"))
+        return MirroredEpisode(self, fields, text_keys, codec, record[start + meta_length:])
+
+    def get(self, episode_id, default=None):
+        """
+        Look up a stored episode by id.
+
+        Returns:
+            MirroredEpisode: The episode, or default if it is not in the mirror.
+        """
+        entry = self._entries.get(episode_id)
+        if entry is None:
+            return default
+        return self._record(entry)
+
+    def feed_ids(self):
+        """
+        Ids of the feeds with episodes in the mirror.
+        """
+        return list(self._by_feed)
+
+    def latest(self, feed_id):
+        """
+        datePublished of the newest stored episode of a feed, or None if it has none.
+        """
+        return self._latest.get(feed_id)
+
+    def episodes(self, feed_id):
+        """
+        Yield the stored episodes of a feed, newest first.
+
+        Returns:
+            Iterator[MirroredEpisode]: Episodes of the feed.
+        """
+        with self._lock:
+            entries = [self._entries[episode_id] for episode_id in self._by_feed.get(feed_id, ())]
+        for entry in sorted(entries, key=lambda entry: entry[2], reverse=True):
+            yield self._record(entry)
+
+    def sync(self, index, feed_ids, max_results=1000, full=False, workers=4):
+        """
+        Fetch the episodes published since the newest stored one of each feed, and merge them.
+
+        Args:
+            index (PodcastIndex): Client used to fetch the episodes.
+            feed_ids (Iterable): Feeds to sync.
+            max_results (int): Episodes fetched per feed. Default: 1000
+            full (bool): Fetch every feed from the start, to pick up edits to older episodes. Default: False
+            workers (int): Feeds fetched concurrently. Default: 4
+
+        Returns:
+            Dict[str, int]: Feeds synced, episodes fetched, written and unchanged.
+        """
+        def fetch(feed_id):
+            since = None if full else self.latest(feed_id)
+            with index.lane(BULK):
+                result = index.episodesByFeedId(feed_id, since=since, max_results=max_results, fulltext=True)
+            return result.get("items") or []
+
+        stats = {"feeds": 0, "fetched": 0, "written": 0, "unchanged": 0}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for items in executor.map(fetch, list(feed_ids)):
+                written, unchanged = self.merge(items)
+                stats["feeds"] += 1
+                stats["fetched"] += len(items)
+                stats["written"] += written
+                stats["unchanged"] += unchanged
+        logger.info("Synced mirror {}: {}".format(self.path, stats))
+        return stats
+
+    def compact(self):
+        """
+        Rewrite the data file without the superseded versions of updated episodes.
+        """
+        with self._lock:
+            data_path = os.path.join(self.path, DATA_FILE)
+            index_path = os.path.join(self.path, INDEX_FILE)
+            entries = sorted(self._entries.values(), key=lambda entry: entry[3])
+            with open(data_path + ".tmp", "wb") as data, open(index_path + ".tmp", "wb") as index:
+                offset = 0
+                for entry in entries:
+                    data.write(self._raw(entry))
+                    index.write(_ENTRY.pack(entry[0], entry[1], entry[2], offset, entry[4], entry[5]))
+                    offset += entry[4]
+            self.close()
+            os.replace(data_path + ".tmp", data_path)
+            os.replace(index_path + ".tmp", index_path)
+            self._open()
@@ -0,0 +1,215 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Stage:
+    def __init__(self, name, fn, workers, processes, flatten):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.processes = processes
+        self.flatten = flatten
+        self.executor = None
+
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self.running = 0
+        self.lock = threading.Lock()
+
+    def stats(self, queue_depth):
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "queued": queue_depth,
+            "busy_seconds": self.busy,
+            "elapsed_seconds": elapsed,
+            "throughput": self.items_out / elapsed if elapsed else 0.0,
+        }
+
+
+class Pipeline:
+    """
+    Push a stream of items through stages connected by bounded queues.
+
+    Each stage runs its function on its own pool of threads, or of processes for CPU heavy work. A stage
+    whose output queue is full blocks, which in turn fills its input queue and slows down the stages
+    before it, so memory stays bounded however fast the source is. Output order is not preserved.
+
+    Args:
+        source (Iterable): Items fed to the first stage, e.g. a list of feed ids.
+        queue_size (int): Capacity of the queue in front of every stage. Default: 100
+        errors (str): "raise" to stop on the first exception and re-raise it from run(), "skip" to count and
+            log it and drop the item. Default: "raise"
+
+    Example:
+        pipeline = Pipeline(feed_ids)
+        pipeline.stage("fetch", lambda feed_id: index.episodesByFeedId(feed_id)["items"], workers=8, flatten=True)
+        pipeline.stage("transform", transform_episode, workers=4, processes=True)
+        pipeline.stage("write", writer.write)
+        stats = pipeline.run()
+    """
+
+    def __init__(self, source, queue_size=100, errors="raise"):
+        if errors not in ("raise", "skip"):
+            raise ValueError("errors must be 'raise' or 'skip'")
+
+        self.source = source
+        self.queue_size = queue_size
+        self.errors = errors
+        self._stages = []
+        self._queues = []
+        self._error = None
+        self._abort = threading.Event()
+
+    def stage(self, name, fn, workers=1, processes=False, flatten=False):
+        """
+        Append a stage.
+
+        Args:
+            name (str): Name used in stats and logs.
+            fn (callable): Called with each item. Its return value goes to the next stage; None drops the item.
+                Must be picklable (a module level function) when processes is True.
+            workers (int): Number of items processed concurrently. Default: 1
+            processes (bool): Run fn in a process pool instead of threads. Default: False
+            flatten (bool): fn returns an iterable whose elements are passed on individually. Default: False
+
+        Returns:
+            Pipeline: self, for chaining.
+        """
+        if workers <= 0:
+            raise ValueError("workers must be positive")
+        self._stages.append(_Stage(name, fn, workers, processes, flatten))
+        return self
+
+    def stats(self):
+        """
+        Per stage counters and throughput in items per second, keyed by stage name.
+        """
+        return dict(
+            (stage.name, stage.stats(self._queues[i].qsize() if self._queues else 0))
+            for i, stage in enumerate(self._stages)
+        )
+
+    def _fail(self, stage, error):
+        with stage.lock:
+            stage.errors += 1
+        if self.errors == "skip":
+            logger.warning("Stage {} failed on an item: {}".format(stage.name, error))
+            return
+        if self._error is None:
+            self._error = error
+        self._abort.set()
+
+    def _feed(self):
+        first = self._queues[0]
+        try:
+            for item in self.source:
+                if self._abort.is_set():
+                    break
+                first.put(item)
+        except Exception as e:
+            self._error = self._error or e
+            self._abort.set()
+        finally:
+            for _ in range(self._stages[0].workers):
+                first.put(_DONE)
+
+    def _work(self, index):
+        stage = self._stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self._queues) else None
+
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if self._abort.is_set():
+                # Keep draining so upstream stages never block on a full queue
+                continue
+
+            with stage.lock:
+                stage.items_in += 1
+            start = time.time()
+            try:
+                if stage.executor is not None:
+                    result = stage.executor.submit(stage.fn, item).result()
+                else:
+                    result = stage.fn(item)
+                results = result if stage.flatten else (result,)
+                for result in results:
+                    if result is None:
+                        continue
+                    if outbox is not None:
+                        outbox.put(result)
+                    with stage.lock:
+                        stage.items_out += 1
+            except Exception as e:
+                self._fail(stage, e)
+            finally:
+                with stage.lock:
+                    stage.busy += time.time() - start
+
+        with stage.lock:
+            stage.running -= 1
+            last = stage.running == 0
+            if last:
+                stage.finished_at = time.time()
+        if last and outbox is not None:
+            for _ in range(self._stages[index + 1].workers):
+                outbox.put(_DONE)
+
+    def run(self):
+        """
+        Run the pipeline until the source is exhausted and every stage has drained.
+
+        Raises:
+            ValueError: If no stage was added.
+            Exception: The first error raised by a stage, when errors is "raise".
+
+        Returns:
+            Dict[str, Dict]: Final per stage stats, see stats().
+        """
+        if not self._stages:
+            raise ValueError("Pipeline has no stages")
+
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in self._stages]
+        threads = [threading.Thread(target=self._feed, name="pipeline-source")]
+        now = time.time()
+        for index, stage in enumerate(self._stages):
+            stage.started_at = now
+            stage.running = stage.workers
+            if stage.processes:
+                stage.executor = ProcessPoolExecutor(max_workers=stage.workers)
+            for n in range(stage.workers):
+                threads.append(threading.Thread(target=self._work, args=(index,), name="{}-{}".format(stage.name, n)))
+
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        finally:
+            for stage in self._stages:
+                if stage.executor is not None:
+                    stage.executor.shutdown()
+                    stage.executor = None
+
+        if self._error is not None:
+            raise self._error
+        return self.stats()
@@ -1,21 +1,66 @@
+import copy
 import hashlib
+import inspect
 import json
 import logging
 import os
+import threading
 import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 import requests
 
+from .cache import TTLCache
+from .credentials import CredentialPool
+from .endpoints import ENDPOINTS
+from .resilience import CircuitBreaker, CircuitOpenError, Hedger, is_upstream_failure
+from .scheduler import BULK, INTERACTIVE, LANES, RequestScheduler
+from .tracing import get_tracer
+from .transport import DNSCache, create_session, warm_up
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
 
+# Http status codes treated as "not found" for negative caching
+NEGATIVE_CACHE_STATUS_CODES = (400, 404)
+
+# What the negative cache keeps of a "not found" http error, rather than the error and its full response
+CachedHTTPError = namedtuple("CachedHTTPError", ["status_code", "reason", "text", "url", "message"])
+
 
 def init(config):
     """
     Create and return a new PodcastIndex object, initialized using the config.
 
     Args:
-        config (Dict): Dictionary with 'api_key' and 'api_secret' keys.
+        config (Dict): Dictionary with 'api_key' and 'api_secret' keys, or a 'credentials' key holding a list of
+            such dictionaries to spread requests over several keys. Optional keys:
+            credential_quarantine (float): Seconds a throttled or rejected key is first set aside. Default: 30
+            negative_cache_ttl (float): Seconds to remember "not found" results of lookups. Default: disabled
+            negative_cache_size (int): Maximum number of remembered "not found" results. Default: 10000
+            cache_ttl (float): Seconds to cache api responses. Default: disabled
+            cache_size (int): Maximum number of cached responses. Default: 1024
+            cache_stale_ttl (float): Seconds an expired response is still served while it is refreshed in the
+                background (stale-while-revalidate). Default: 0
+            cache_workers (int): Threads used for background refreshes. Default: 2
+            max_concurrent_requests (int): Schedule requests through priority lanes with at most this many in
+                flight. Default: unlimited, no scheduling
+            reserved_interactive_slots (int): Slots only interactive requests may use. Default: 1, or 0 when
+                max_concurrent_requests is 1
+            default_lane (str): Lane of calls made outside index.lane(). Default: "interactive"
+            tracer (object or str): "opentelemetry", or an object with a span(name, **attributes) context manager
+                such as podcastindex.tracing.RecordingTracer. Default: no tracing
+            circuit_breaker (bool or Dict): Fail fast on endpoints with a high error rate. A dict is passed to
+                podcastindex.resilience.CircuitBreaker. Default: disabled
+            hedging (bool or Dict): Send a second request when an idempotent call is slower than its recent p95. A
+                dict is passed to podcastindex.resilience.Hedger. Default: disabled
+            base_url (str): Root of the api. Default: "https://api.podcastindex.org/api/1.0"
+            pool_size (int): Connections kept open to the api. Default: 10
+            dns_cache_ttl (float): Seconds to reuse the api's resolved address. Default: disabled
+            warm_connections (int): Connections to open while constructing the client, at most pool_size.
+                Default: 0
 
     Returns:
         PodcastIndex: Initialized PodcastIndex object.
@@ -49,6 +94,15 @@ def get_config_from_env():
 
 class PodcastIndex:
     def __init__(self, config):
+        # Pool of api keys, used instead of a single key when several credentials are configured
+        self.credential_pool = None
+        if "credentials" in config:
+            self.credential_pool = CredentialPool(
+                config["credentials"], quarantine=config.get("credential_quarantine", 30)
+            )
+            first = self.credential_pool.credentials[0]
+            config = dict(config, api_key=first.api_key, api_secret=first.api_secret)
+
         assert "api_key" in config
         assert "api_secret" in config
 
@@ -58,21 +112,96 @@ class PodcastIndex:
         self.api_key = config["api_key"]
         self.api_secret = config["api_secret"]
 
-        self.base_url = "https://api.podcastindex.org/api/1.0"
+        self.base_url = config.get("base_url", "https://api.podcastindex.org/api/1.0")
+
+        # Endpoint urls are joined once, here, rather than on every call
+        self._routes = dict((name, (self.base_url + endpoint.path, endpoint)) for name, endpoint in ENDPOINTS.items())
+        self._endpoints_by_url = dict((url, endpoint) for url, endpoint in self._routes.values())
+
+        # Cache of "not found" lookup results, disabled unless a ttl is configured
+        self.negative_cache = None
+        if config.get("negative_cache_ttl"):
+            self.negative_cache = TTLCache(
+                config.get("negative_cache_size", 10000), config["negative_cache_ttl"]
+            )
 
-    def _create_headers(self):
+        # Response cache, disabled unless a ttl is configured
+        self.cache = None
+        if config.get("cache_ttl"):
+            self.cache = TTLCache(
+                config.get("cache_size", 1024), config["cache_ttl"], config.get("cache_stale_ttl", 0)
+            )
+        self._cache_workers = config.get("cache_workers", 2)
+        self._refresh_executor = None
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+
+        # Priority lanes in front of the transport, disabled unless a concurrency limit is configured
+        self.scheduler = None
+        if config.get("max_concurrent_requests"):
+            self.scheduler = RequestScheduler(
+                config["max_concurrent_requests"], config.get("reserved_interactive_slots")
+            )
+        self.default_lane = config.get("default_lane", INTERACTIVE)
+        if self.default_lane not in LANES:
+            raise ValueError("Unknown lane: {}".format(self.default_lane))
+        self._local = threading.local()
+
+        # Spans around each stage of a call, no-op unless a tracer is configured
+        self.tracer = get_tracer(config.get("tracer"))
+
+        # Per endpoint circuit breakers and request hedging, both disabled unless configured
+        self._breaker_options = config.get("circuit_breaker")
+        if self._breaker_options is True:
+            self._breaker_options = {}
+        self.circuit_breakers = {}
+        self._breakers_lock = threading.Lock()
+
+        self.hedger = None
+        if config.get("hedging"):
+            self.hedger = Hedger(**(config["hedging"] if isinstance(config["hedging"], dict) else {}))
+
+        # Kept-alive connections to the api, optionally opened ahead of the first request
+        self.dns_cache = None
+        if config.get("dns_cache_ttl"):
+            self.dns_cache = DNSCache(config["dns_cache_ttl"])
+        self.session = create_session(config.get("pool_size", 10), self.dns_cache)
+        if config.get("warm_connections"):
+            self.warm_up(config["warm_connections"])
+
+    def warm_up(self, connections=1):
+        """
+        Resolve the api's address and open connections to it now, so the next requests do not pay for the name
+        lookup and tls handshake.
+
+        Args:
+            connections (int): Connections to open, at most the pool size. Default: 1
+
+        Returns:
+            int: Connections opened. Failures are logged, not raised.
+        """
+        return warm_up(self.session, self.base_url, connections, self.timeout)
+
+    def _create_headers(self, credential=None):
         """
         Hash the current timestamp along with the api key and secret to
         produce the headers for calling the api.
 
+        Args:
+            credential (Credential, optional): Key from the credential pool to sign with. Defaults to the
+                configured api key and secret.
+
         Returns:
             dict: dictionary of header data
         """
+        api_key = self.api_key if credential is None else credential.api_key
+        api_secret = self.api_secret if credential is None else credential.api_secret
+
         # we'll need the unix time
         epoch_time = int(time.time())
 
         # our hash here is the api key + secret + time
-        data_to_hash = self.api_key + self.api_secret + str(epoch_time)
+        data_to_hash = api_key + api_secret + str(epoch_time)
 
         # which is then sha-1'd
         sha_1 = hashlib.sha1(data_to_hash.encode()).hexdigest()
@@ -80,28 +209,282 @@ class PodcastIndex:
         # now we build our request headers
         headers = {
             "X-Auth-Date": str(epoch_time),
-            "X-Auth-Key": self.api_key,
+            "X-Auth-Key": api_key,
             "Authorization": sha_1,
             "User-Agent": "Voyce",
         }
 
         return headers
 
-    def _make_request_get_result_helper(self, url, payload):
+    @staticmethod
+    def _is_negative_result(result_dict):
+        """
+        Whether an api response means the requested feed or episode does not exist.
+        """
+        if str(result_dict.get("status")).lower() == "false":
+            return True
+        for key in ("feed", "episode"):
+            if key in result_dict and not result_dict[key]:
+                return True
+        return False
+
+    def build_request(self, name, *args, **kwargs):
+        """
+        Build the url and payload a method would send, without sending it.
+
+        Args:
+            name (str): Name of the method, e.g. "episodesByFeedId".
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            Tuple[str, Dict]: Url and payload.
+        """
+        bound = inspect.signature(getattr(self, name)).bind(*args, **kwargs)
+        bound.apply_defaults()
+        url, endpoint = self._routes[name]
+        return url, endpoint.build_payload(*bound.args)
+
+    def _invalidate(self, cache, name, args, kwargs):
+        if cache is None:
+            return False
+        if name is None:
+            removed = len(cache) > 0
+            cache.clear()
+            return removed
+        return cache.invalidate(ENDPOINTS[name].cache_key(*self.build_request(name, *args, **kwargs)))
+
+    def invalidate_negative_cache(self, name=None, *args, **kwargs):
+        """
+        Forget remembered "not found" results.
+
+        Args:
+            name (str, optional): Method whose result to forget, e.g. "podcastByItunesId". Clears everything when
+                omitted.
+            *args: Arguments the method was called with.
+            **kwargs: Keyword arguments the method was called with.
+
+        Returns:
+            bool: True if anything was removed.
+        """
+        return self._invalidate(self.negative_cache, name, args, kwargs)
+
+    def invalidate_cache(self, name=None, *args, **kwargs):
+        """
+        Drop cached responses.
+
+        Args:
+            name (str, optional): Method whose result to drop, e.g. "trendingPodcasts". Clears everything when
+                omitted.
+            *args: Arguments the method was called with.
+            **kwargs: Keyword arguments the method was called with.
+
+        Returns:
+            bool: True if anything was removed.
+        """
+        return self._invalidate(self.cache, name, args, kwargs)
+
+    @contextmanager
+    def lane(self, lane):
+        """
+        Run the calls made by this thread inside the block in the given priority lane.
+
+        Args:
+            lane (str): "interactive" or "bulk".
+
+        Example:
+            with index.lane("bulk"):
+                index.episodesByFeedId(feedId, max_results=1000)
+        """
+        if lane not in LANES:
+            raise ValueError("Unknown lane: {}".format(lane))
+        previous = getattr(self._local, "lane", None)
+        self._local.lane = lane
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def _current_lane(self):
+        return getattr(self._local, "lane", None) or self.default_lane
+
+    def _circuit_breaker(self, key):
+        if self._breaker_options is None:
+            return None
+        with self._breakers_lock:
+            breaker = self.circuit_breakers.get(key)
+            if breaker is None:
+                breaker = self.circuit_breakers[key] = CircuitBreaker(**self._breaker_options)
+            return breaker
+
+    def _perform_request(self, url, payload, negative_cache_key=None, endpoint=None):
+        """
+        Perform the request and parse the result, remembering "not found" results when negative_cache_key is given.
+
+        Raises:
+            CircuitOpenError: When the endpoint's circuit breaker is open.
+        """
+        key = endpoint.name if endpoint is not None else url
+        breaker = self._circuit_breaker(key)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError("Circuit breaker for {} is open".format(key))
+
+        try:
+            if self.hedger is not None and endpoint is not None and endpoint.idempotent:
+                lane = self._current_lane()
+
+                def attempt():
+                    with self.lane(lane):
+                        return self._perform_request_scheduled(url, payload, negative_cache_key)
+
+                result_dict = self.hedger.run(key, attempt)
+            else:
+                result_dict = self._perform_request_scheduled(url, payload, negative_cache_key)
+        except Exception as e:
+            if breaker is not None:
+                breaker.record(is_upstream_failure(e))
+            raise
+
+        if breaker is not None:
+            breaker.record(False)
+        return result_dict
+
+    def _perform_request_scheduled(self, url, payload, negative_cache_key=None):
+        if self.scheduler is None:
+            return self._perform_request_unscheduled(url, payload, negative_cache_key)
+
+        lane = self._current_lane()
+        with self.tracer.span("podcastindex.queue", lane=lane):
+            self.scheduler.acquire(lane)
+        try:
+            return self._perform_request_unscheduled(url, payload, negative_cache_key)
+        finally:
+            self.scheduler.release(lane)
+
+    def _post(self, url, payload):
+        """
+        Sign and send the request, with a key from the credential pool when one is configured.
+        """
+        credential = None
+        if self.credential_pool is not None:
+            credential = self.credential_pool.acquire()
+
+        status_code = None
+        try:
+            with self.tracer.span("podcastindex.sign"):
+                headers = self._create_headers(credential)
+            with self.tracer.span("podcastindex.http", url=url):
+                result = self.session.post(url, headers=headers,
+                                           data=payload, timeout=self.timeout)
+            status_code = result.status_code
+            return result
+        finally:
+            if credential is not None:
+                self.credential_pool.release(credential, status_code)
+
+    def _perform_request_unscheduled(self, url, payload, negative_cache_key=None):
+        result = self._post(url, payload)
+        try:
+            result.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            if negative_cache_key is not None and result.status_code in NEGATIVE_CACHE_STATUS_CODES:
+                self.negative_cache.set(negative_cache_key, CachedHTTPError(
+                    result.status_code, getattr(result, "reason", None), result.text, url, str(e)
+                ))
+            raise
+
+        # Parse the result as a dict
+        with self.tracer.span("podcastindex.parse"):
+            result_dict = json.loads(result.text)
+        if negative_cache_key is not None and self._is_negative_result(result_dict):
+            self.negative_cache.set(negative_cache_key, copy.deepcopy(result_dict))
+        return result_dict
+
+    def _refresh_in_background(self, cache_key, url, payload, endpoint):
+        """
+        Refresh a stale cache entry on the worker pool, at most once at a time per key.
+        """
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=self._cache_workers)
+
+        def refresh():
+            try:
+                with self.lane(BULK):
+                    result_dict = self._perform_request(url, payload, endpoint=endpoint)
+                if not self._is_negative_result(result_dict):
+                    self.cache.set(cache_key, result_dict)
+            except Exception as e:
+                logger.warning("Background refresh of {} failed: {}".format(cache_key, e))
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+
+        self._refresh_executor.submit(refresh)
+
+    def _call(self, name, *args):
+        """
+        Call the endpoint registered under a method's name with all of that method's arguments, in order.
+        """
+        url, endpoint = self._routes[name]
+        with self.tracer.span("podcastindex.request", endpoint=name):
+            return self._get_result(url, endpoint.build_payload(*args), endpoint)
+
+    def _make_request_get_result_helper(self, url, payload, endpoint=None):
         """
         Helper method DRY up the code. It performs the request and returns the result.
 
         Returns:
             [type]: [description]
         """
-        # Perform request
-        headers = self._create_headers()
-        result = requests.post(url, headers=headers,
-                               data=payload, timeout=self.timeout)
-        result.raise_for_status()
+        if endpoint is None:
+            endpoint = self._endpoints_by_url.get(url)
 
-        # Parse the result as a dict
-        result_dict = json.loads(result.text)
+        with self.tracer.span("podcastindex.request", endpoint=endpoint.name if endpoint is not None else url):
+            return self._get_result(url, payload, endpoint)
+
+    @staticmethod
+    def _http_error(cached):
+        """
+        Rebuild a fresh HTTPError, with a lightweight response, from a negative cache entry.
+        """
+        response = requests.Response()
+        response.status_code = cached.status_code
+        response.reason = cached.reason
+        response.url = cached.url
+        response.encoding = "utf-8"
+        response._content = cached.text.encode("utf-8")
+        return requests.exceptions.HTTPError(cached.message, response=response)
+
+    def _get_result(self, url, payload, endpoint):
+        """
+        Serve the request from the caches when possible, otherwise perform it.
+        """
+        negative_cache_key = None
+        if self.negative_cache is not None and endpoint is not None and endpoint.negative_cacheable:
+            negative_cache_key = endpoint.cache_key(url, payload)
+            cached = self.negative_cache.get(negative_cache_key)
+            if isinstance(cached, CachedHTTPError):
+                raise self._http_error(cached)
+            if cached is not None:
+                return copy.deepcopy(cached)
+
+        if self.cache is None or endpoint is None or not endpoint.cacheable:
+            return self._perform_request(url, payload, negative_cache_key, endpoint)
+
+        cache_key = endpoint.cache_key(url, payload)
+        cached, fresh = self.cache.lookup(cache_key)
+        if cached is not None:
+            if not fresh:
+                self._refresh_in_background(cache_key, url, payload, endpoint)
+            return copy.deepcopy(cached)
+
+        result_dict = self._perform_request(url, payload, negative_cache_key, endpoint)
+        if not self._is_negative_result(result_dict):
+            self.cache.set(cache_key, copy.deepcopy(result_dict))
         return result_dict
 
     def search(self, query, clean=False):
@@ -119,16 +502,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/search/byterm"
-
-        # Setup payload
-        payload = {"q": query}
-        if clean:
-            payload["clean"] = 1
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("search", query, clean)
 
     def podcastByFeedUrl(self, feedUrl):
         """
@@ -144,14 +518,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/podcasts/byfeedurl"
-
-        # Setup payload
-        payload = {"url": feedUrl}
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("podcastByFeedUrl", feedUrl)
 
     def podcastByFeedId(self, feedId):
         """
@@ -167,14 +534,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/podcasts/byfeedid"
-
-        # Setup payload
-        payload = {"id": feedId}
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("podcastByFeedId", feedId)
 
     def podcastByItunesId(self, itunesId):
         """
@@ -190,14 +550,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/podcasts/byitunesid"
-
-        # Setup payload
-        payload = {"id": itunesId}
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("podcastByItunesId", itunesId)
 
     def episodesByFeedUrl(self, feedUrl, since=None, max_results=10, fulltext=False):
         """
@@ -217,18 +570,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/episodes/byfeedurl"
-
-        # Setup payload
-        payload = {"url": feedUrl, "max": max_results}
-        if since:
-            payload["since"] = since
-        if fulltext:
-            payload["fulltext"] = True
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("episodesByFeedUrl", feedUrl, since, max_results, fulltext)
 
     def podcastByGuid(self, guid):
         """
@@ -244,14 +586,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/podcasts/byguid"
-
-        # Setup payload
-        payload = {"guid": guid}
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("podcastByGuid", guid)
 
     def episodesByFeedId(
         self, feedId, since=None, max_results=10, fulltext=False, enclosure=None
@@ -274,20 +609,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/episodes/byfeedid"
-
-        # Setup payload
-        payload = {"id": feedId, "max": max_results}
-        if since:
-            payload["since"] = since
-        if fulltext:
-            payload["fulltext"] = True
-        if enclosure:
-            payload["enclosure"] = enclosure
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("episodesByFeedId", feedId, since, max_results, fulltext, enclosure)
 
     def episodesByItunesId(
         self, itunesId, since=None, max_results=10, fulltext=False, enclosure=None
@@ -311,24 +633,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/episodes/byitunesid"
-
-        # Setup payload
-        payload = {
-            "id": itunesId,
-            "max": max_results,
-            "fulltext": True,
-        }
-        if since:
-            payload["since"] = since
-        if fulltext:
-            payload["fulltext"] = True
-        if enclosure:
-            payload["enclosure"] = enclosure
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("episodesByItunesId", itunesId, since, max_results, fulltext, enclosure)
 
     def episodesByPodcastGuid(
         self, podcastGuid, since=None, max_results=10, fulltext=False, enclosure=None
@@ -351,20 +656,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/episodes/bypodcastguid"
-
-        # Setup payload
-        payload = {"guid": podcastGuid, "max": max_results}
-        if since:
-            payload["since"] = since
-        if fulltext:
-            payload["fulltext"] = True
-        if enclosure:
-            payload["enclosure"] = enclosure
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("episodesByPodcastGuid", podcastGuid, since, max_results, fulltext, enclosure)
 
     def episodeById(self, id, fulltext=False):
         """
@@ -381,16 +673,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/episodes/byid"
-
-        # Setup payload
-        payload = {"id": id}
-        if fulltext:
-            payload["fulltext"] = True
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("episodeById", id, fulltext)
 
     def episodeByGuid(
         self, guid, feedurl=None, feedid=None, podcastguid=None, fulltext=False
@@ -421,22 +704,7 @@ class PodcastIndex:
                 "At least one of feedurl or feedid or podcastguid must not be None or empty"
             )
 
-        # Setup request
-        url = self.base_url + "/episodes/byguid"
-
-        # Setup payload
-        payload = {"guid": guid}
-        if feedurl:
-            payload["feedurl"] = feedurl
-        if feedid:
-            payload["feedid"] = feedid
-        if podcastguid:
-            payload["podcastguid"] = podcastguid
-        if fulltext:
-            payload["fulltext"] = True
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("episodeByGuid", guid, feedurl, feedid, podcastguid, fulltext)
 
     def episodesByPerson(self, query, clean=False, fulltext=False):
         """
@@ -454,18 +722,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/search/byperson"
-
-        # Setup payload
-        payload = {"q": query}
-        if clean:
-            payload["clean"] = 1
-        if fulltext:
-            payload["fulltext"] = True
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("episodesByPerson", query, clean, fulltext)
 
     def randomEpisodes(self, max=None, lang=None, cat=None, notcat=None, fulltext=False):
         """
@@ -487,24 +744,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/episodes/random"
-
-        # Setup payload
-        payload = {"pretty": 1}
-        if max:
-            payload["max"] = max
-        if lang:
-            payload["lang"] = lang
-        if cat:
-            payload["cat"] = cat
-        if notcat:
-            payload["notcat"] = notcat
-        if fulltext:
-            payload["fulltext"] = True
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("randomEpisodes", max, lang, cat, notcat, fulltext)
 
 
     def recentEpisodes(
@@ -529,22 +769,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/recent/episodes"
-
-        # Setup payload
-        payload = {}
-        if max:
-            payload["max"] = max
-        if excluding:
-            payload["excludeString"] = excluding
-        if before_episode_id:
-            payload["before"] = before_episode_id
-        if fulltext:
-            payload["fulltext"] = True
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("recentEpisodes", max, excluding, before_episode_id, fulltext)
 
     def recentFeeds(
         self, max=40, since=None, lang=None, categories=None, not_categories=None
@@ -569,24 +794,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/recent/feeds"
-
-        # Setup payload
-        payload = {}
-        if max:
-            payload["max"] = max
-        if since:
-            payload["since"] = since
-        if lang:
-            payload["lang"] = ",".join(str(i) for i in lang)
-        if categories:
-            payload["cat"] = ",".join(str(i) for i in categories)
-        if not_categories:
-            payload["notcat"] = ",".join(str(i) for i in not_categories)
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("recentFeeds", max, since, lang, categories, not_categories)
 
     def newFeeds(self, max=40, since=None, feed_id=None, desc=None):
         """
@@ -608,22 +816,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/recent/feeds"
-
-        # Setup payload
-        payload = {}
-        if max:
-            payload["max"] = max
-        if since:
-            payload["since"] = since
-        if feed_id:
-            payload["feedid"] = feed_id
-        if desc:
-            payload["desc"] = desc
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("newFeeds", max, since, feed_id, desc)
 
     def trendingPodcasts(
         self, max=10, since=None, lang=None, categories=None, not_categories=None
@@ -641,24 +834,7 @@ class PodcastIndex:
             not_categories ([string or int], optional): A list of categories used to limit exclude certain podcasts
                 from results. Category names and IDs are both supported.
         """
-        # Setup request
-        url = self.base_url + "/podcasts/trending"
-
-        # Setup payload
-        payload = {}
-        if max:
-            payload["max"] = max
-        if since:
-            payload["since"] = since
-        if lang:
-            payload["lang"] = ",".join(str(i) for i in lang)
-        if categories:
-            payload["cat"] = ",".join(str(i) for i in categories)
-        if not_categories:
-            payload["notcat"] = ",".join(str(i) for i in not_categories)
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("trendingPodcasts", max, since, lang, categories, not_categories)
 
     def addByItunesId(self, itunesId):
         """
@@ -674,17 +850,7 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/add/byitunesid"
-
-        # Setup payload
-        payload = {
-            "id": itunesId,
-            "pretty": 1,
-        }
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("addByItunesId", itunesId)
 
     def pubNotifyUpdate(self, id):
         """
@@ -700,14 +866,4 @@ class PodcastIndex:
         Returns:
             Dict: API response
         """
-        # Setup request
-        url = self.base_url + "/hub/pubnotify"
-
-        # Setup payload
-        payload = {
-            "id": id,
-            "pretty": 1,
-        }
-
-        # Call Api for result
-        return self._make_request_get_result_helper(url, payload)
+        return self._call("pubNotifyUpdate", id)
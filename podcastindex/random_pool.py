@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .scheduler import BULK
+
+logger = logging.getLogger(__name__)
+
+
+class _Buffer:
+    def __init__(self, max_seen):
+        self.episodes = deque()
+        self.seen = set()
+        self.seen_order = deque()
+        self.max_seen = max_seen
+        self.refilling = False
+        # Consecutive refills that added nothing, and when the next one may start
+        self.failures = 0
+        self.retry_at = 0.0
+        self.draws = 0
+        self.misses = 0
+
+    def remember(self, episode_id):
+        self.seen.add(episode_id)
+        self.seen_order.append(episode_id)
+        while len(self.seen_order) > self.max_seen:
+            self.seen.discard(self.seen_order.popleft())
+
+
+class RandomEpisodePool:
+    """
+    Serve random episodes from local buffers kept topped up in the background.
+
+    Each (lang, cat, notcat) combination gets its own buffer. When a buffer drops below low_water, a
+    background worker refills it with one randomEpisodes call, in the bulk lane when priority lanes are
+    configured. Episodes already buffered or served recently (the last max_seen per combination) are
+    skipped, so draws do not repeat. A refill that adds nothing, because the call failed or only returned
+    episodes already seen, is retried after a backoff that doubles up to max_backoff. The total number of
+    buffered episodes is capped at max_episodes: a refill takes room from the least recently drawn
+    combinations first. At most max_filters combinations are kept, the least recently used one being dropped.
+
+    Args:
+        index (PodcastIndex): Client used to fetch episodes.
+        batch_size (int): Episodes requested per refill. Default: 100
+        low_water (int): Buffer size below which a refill starts. Default: 20
+        max_episodes (int): Buffered episodes across all combinations. Default: 5000
+        max_filters (int): Filter combinations kept. Default: 32
+        max_seen (int): Recently served episode ids remembered per combination. Default: 10000
+        workers (int): Background refill threads. Default: 2
+        retry_backoff (float): Seconds before retrying a refill that added nothing. Default: 0.5
+        max_backoff (float): Longest wait between such retries. Default: 30
+        fulltext (bool): Fetch full text in the text fields. Default: False
+    """
+
+    def __init__(
+        self,
+        index,
+        batch_size=100,
+        low_water=20,
+        max_episodes=5000,
+        max_filters=32,
+        max_seen=10000,
+        workers=2,
+        retry_backoff=0.5,
+        max_backoff=30,
+        fulltext=False,
+    ):
+        self.index = index
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.max_episodes = max_episodes
+        self.max_filters = max_filters
+        self.max_seen = max_seen
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.fulltext = fulltext
+
+        self._buffers = OrderedDict()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def _buffer(self, key):
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = _Buffer(self.max_seen)
+            while len(self._buffers) > self.max_filters:
+                _, evicted = self._buffers.popitem(last=False)
+                self._size -= len(evicted.episodes)
+        self._buffers.move_to_end(key)
+        return buffer
+
+    def _maybe_refill(self, key, buffer):
+        if buffer.refilling or len(buffer.episodes) >= self.low_water:
+            return
+        if time.time() < buffer.retry_at:
+            return
+        buffer.refilling = True
+        self._executor.submit(self._refill, key, buffer)
+
+    def _make_room(self, key, needed):
+        # Take space from combinations used less recently than key, never from more recent ones
+        for other_key, other in self._buffers.items():
+            if self._size + needed <= self.max_episodes or other_key == key:
+                break
+            while other.episodes and self._size + needed > self.max_episodes:
+                other.episodes.pop()
+                self._size -= 1
+
+    def _refill(self, key, buffer):
+        lang, cat, notcat = key
+        episodes = []
+        try:
+            with self.index.lane(BULK):
+                result = self.index.randomEpisodes(
+                    max=self.batch_size, lang=lang, cat=cat, notcat=notcat, fulltext=self.fulltext
+                )
+            episodes = result.get("episodes") or []
+        except Exception as e:
+            logger.warning("Refilling random episodes for {} failed: {}".format(key, e))
+
+        with self._cond:
+            buffer.refilling = False
+            added = 0
+            if self._buffers.get(key) is buffer:
+                self._make_room(key, len(episodes))
+                for episode in episodes:
+                    if self._size >= self.max_episodes:
+                        break
+                    if episode.get("id") in buffer.seen:
+                        continue
+                    buffer.remember(episode.get("id"))
+                    buffer.episodes.append(episode)
+                    self._size += 1
+                    added += 1
+            if added:
+                buffer.failures = 0
+                buffer.retry_at = 0.0
+            else:
+                buffer.failures += 1
+                delay = min(self.retry_backoff * 2 ** (buffer.failures - 1), self.max_backoff)
+                buffer.retry_at = time.time() + delay
+            self._cond.notify_all()
+
+    def prefetch(self, lang=None, cat=None, notcat=None):
+        """
+        Start filling the buffer for a filter combination ahead of the first draw.
+        """
+        with self._cond:
+            key = (lang, cat, notcat)
+            self._maybe_refill(key, self._buffer(key))
+
+    def draw(self, lang=None, cat=None, notcat=None, timeout=5):
+        """
+        Take a random episode matching the filters.
+
+        Args:
+            lang (str): Language code to filter by.
+            cat (str): Only episodes with these categories.
+            notcat (str): No episodes with these categories.
+            timeout (float): Seconds to wait when the buffer is empty. 0 never waits. Default: 5
+
+        Returns:
+            Dict: Episode, or None if none arrived within the timeout.
+        """
+        key = (lang, cat, notcat)
+        deadline = time.time() + timeout
+        with self._cond:
+            buffer = self._buffer(key)
+            if not buffer.episodes:
+                buffer.misses += 1
+            while not buffer.episodes:
+                self._maybe_refill(key, buffer)
+                now = time.time()
+                remaining = deadline - now
+                if remaining <= 0 or self._buffers.get(key) is not buffer:
+                    return None
+                if not buffer.refilling and buffer.retry_at > now:
+                    # Backing off after a refill that added nothing, wake up when a retry is allowed
+                    remaining = min(remaining, buffer.retry_at - now)
+                self._cond.wait(remaining)
+
+            episode = buffer.episodes.popleft()
+            self._size -= 1
+            buffer.draws += 1
+            self._maybe_refill(key, buffer)
+            return episode
+
+    def stats(self):
+        """
+        Buffered episodes, draws and empty buffer misses per filter combination.
+
+        Returns:
+            Dict[Tuple, Dict]: Counters keyed by (lang, cat, notcat).
+        """
+        with self._cond:
+            return dict(
+                (key, {"buffered": len(b.episodes), "draws": b.draws, "misses": b.misses})
+                for key, b in self._buffers.items()
+            )
@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of calling an endpoint whose circuit breaker is open.
+    """
+
+
+def is_upstream_failure(error):
+    """
+    Whether an exception means the api itself is struggling: timeouts, connection errors and 5xx
+    responses. Client errors such as 404 do not count.
+    """
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError):
+        response = getattr(error, "response", None)
+        return response is None or response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an endpoint is unhealthy.
+
+    The breaker opens once at least failure_ratio of the last window calls failed (and at least
+    min_calls were made). After reset_timeout seconds it lets a single probe through: success closes
+    it again, failure keeps it open for another reset_timeout.
+
+    Args:
+        failure_ratio (float): Share of failed calls that opens the breaker. Default: 0.5
+        window (int): Number of recent calls considered. Default: 20
+        min_calls (int): Calls needed in the window before the breaker can open. Default: 10
+        reset_timeout (float): Seconds to stay open before probing. Default: 30
+    """
+
+    def __init__(self, failure_ratio=0.5, window=20, min_calls=10, reset_timeout=30):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether a call may go through now. A True answer must be followed by record().
+
+        Returns:
+            bool: False while the breaker is open.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.time() >= self._opened_at + self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, failed):
+        """
+        Record the outcome of an allowed call.
+
+        Args:
+            failed (bool): Whether the call failed.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls:
+                if sum(self._outcomes) >= self.failure_ratio * len(self._outcomes):
+                    self._open()
+
+    def _open(self):
+        if self.state != OPEN:
+            logger.warning("Circuit breaker opened")
+        self.state = OPEN
+        self._opened_at = time.time()
+        self._outcomes.clear()
+
+
+class Hedger:
+    """
+    Send a second, identical request when the first one is slower than usual, and use whichever answers
+    first.
+
+    The hedge is sent once the first attempt has been running longer than the given percentile of recent
+    latencies for the same endpoint. Hedges are capped at budget times the number of requests, so they add
+    at most that much extra load.
+
+    Attempts only run on the worker pool while it has an idle thread, so the hedge delay never includes time
+    spent queueing. When every worker is busy the request runs on the caller's thread, unhedged, so the pool
+    size does not limit how many requests are in flight.
+
+    Args:
+        percentile (float): Latency percentile after which to hedge. Default: 0.95
+        budget (float): Maximum hedges per request. Default: 0.1
+        min_samples (int): Latencies needed for an endpoint before hedging it. Default: 20
+        window (int): Recent latencies kept per endpoint. Default: 200
+        max_workers (int): Threads running hedged attempts. Default: 32
+    """
+
+    def __init__(self, percentile=0.95, budget=0.1, min_samples=20, window=200, max_workers=32):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.window = window
+        self.max_workers = max_workers
+        self.requests = 0
+        self.hedges = 0
+        self._busy = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def delay(self, key):
+        """
+        Seconds to wait before hedging a request to key, or None when there is not enough data.
+        """
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        return ordered[int(self.percentile * (len(ordered) - 1))]
+
+    def record(self, key, latency):
+        with self._lock:
+            if key not in self._latencies:
+                self._latencies[key] = deque(maxlen=self.window)
+            self._latencies[key].append(latency)
+
+    def _take_budget(self):
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _submit(self, fn):
+        # Run fn on an idle worker, or return None when there is none
+        with self._lock:
+            if self._busy >= self.max_workers:
+                return None
+            self._busy += 1
+
+        def run():
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+        return self._executor.submit(run)
+
+    def run(self, key, attempt):
+        """
+        Run attempt(), hedging it if it is slow.
+
+        Args:
+            key (str): Endpoint the latencies are tracked for.
+            attempt (callable): Performs the request and returns its result. Called at most twice.
+
+        Returns:
+            object: Result of the first successful attempt.
+        """
+        started = threading.Event()
+
+        def timed():
+            started.set()
+            start = time.time()
+            result = attempt()
+            self.record(key, time.time() - start)
+            return result
+
+        with self._lock:
+            self.requests += 1
+
+        delay = self.delay(key)
+        first = None if delay is None else self._submit(timed)
+        if first is None:
+            return timed()
+
+        # The delay counts from when the attempt starts, not from when it was handed to the pool
+        started.wait()
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_budget():
+            return first.result()
+
+        hedge = self._submit(timed)
+        if hedge is None:
+            with self._lock:
+                self.hedges -= 1
+            return first.result()
+
+        logger.debug("Hedging request to {} after {:.3f}s".format(key, delay))
+        pending = set([first, hedge])
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# Lanes in priority order, highest first
+LANES = (INTERACTIVE, BULK)
+
+
+class _LaneStats:
+    def __init__(self, window):
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_waits = deque(maxlen=window)
+
+    def record_wait(self, wait):
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.recent_waits.append(wait)
+
+    def as_dict(self):
+        waits = sorted(self.recent_waits)
+        started = self.completed + self.in_flight
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "wait_avg": self.wait_total / started if started else 0.0,
+            "wait_max": self.wait_max,
+            "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+        }
+
+
+class RequestScheduler:
+    """
+    Admit requests into a fixed number of concurrent slots, by priority lane.
+
+    Waiting interactive requests always go before waiting bulk requests, and bulk requests may only
+    use max_concurrent - reserved_interactive slots. Interactive requests therefore never queue behind
+    a bulk backlog: they wait at most for other interactive requests or a reserved slot to free up.
+
+    Args:
+        max_concurrent (int): Total number of requests in flight at once.
+        reserved_interactive (int, optional): Slots bulk traffic may never use. Default: 1, or 0 when
+            max_concurrent is 1
+        window (int): Number of recent wait times kept per lane for percentiles. Default: 1000
+    """
+
+    def __init__(self, max_concurrent, reserved_interactive=None, window=1000):
+        if max_concurrent <= 0:
+            raise ValueError("max_concurrent must be positive")
+        if reserved_interactive is None:
+            reserved_interactive = min(1, max_concurrent - 1)
+        if not 0 <= reserved_interactive < max_concurrent:
+            raise ValueError("reserved_interactive must be between 0 and max_concurrent - 1")
+
+        self.max_concurrent = max_concurrent
+        self.reserved_interactive = reserved_interactive
+        self._limits = {INTERACTIVE: max_concurrent, BULK: max_concurrent - reserved_interactive}
+        self._in_flight = 0
+        self._waiting = dict((lane, deque()) for lane in LANES)
+        self._stats = dict((lane, _LaneStats(window)) for lane in LANES)
+        self._cond = threading.Condition()
+
+    def _can_start(self, lane, ticket):
+        if self._waiting[lane][0] is not ticket:
+            return False
+        if self._in_flight >= self._limits[lane]:
+            return False
+        for other in LANES[:LANES.index(lane)]:
+            if self._waiting[other]:
+                return False
+        return True
+
+    def acquire(self, lane=INTERACTIVE):
+        """
+        Block until a slot is available for the lane.
+
+        Args:
+            lane (str): "interactive" or "bulk". Default: "interactive"
+
+        Raises:
+            ValueError: If the lane is unknown.
+        """
+        if lane not in self._waiting:
+            raise ValueError("Unknown lane: {}".format(lane))
+
+        ticket = object()
+        stats = self._stats[lane]
+        start = time.time()
+        with self._cond:
+            self._waiting[lane].append(ticket)
+            stats.queued += 1
+            try:
+                while not self._can_start(lane, ticket):
+                    self._cond.wait()
+            finally:
+                self._waiting[lane].remove(ticket)
+                stats.queued -= 1
+            self._in_flight += 1
+            stats.in_flight += 1
+            stats.record_wait(time.time() - start)
+            # The next waiter in this lane may be able to start too
+            self._cond.notify_all()
+
+    def release(self, lane=INTERACTIVE):
+        """
+        Give back a slot taken with acquire().
+        """
+        with self._cond:
+            self._in_flight -= 1
+            self._stats[lane].in_flight -= 1
+            self._stats[lane].completed += 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane=INTERACTIVE):
+        """
+        Context manager holding a slot for the lane.
+        """
+        self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def stats(self):
+        """
+        Per lane queue depth, in flight and completed counts, and wait times in seconds.
+
+        Returns:
+            Dict[str, Dict]: Metrics keyed by lane.
+        """
+        with self._cond:
+            return dict((lane, self._stats[lane].as_dict()) for lane in LANES)
@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .resilience import CircuitOpenError, is_upstream_failure
+
+logger = logging.getLogger(__name__)
+
+# Write endpoints the queue can submit to
+SUBMIT_METHODS = ("pubNotifyUpdate", "addByItunesId")
+
+
+class SubmissionQueue:
+    """
+    Debounced, retried background submission of pubNotifyUpdate and addByItunesId calls.
+
+    Repeated submissions of the same id while one is still pending are merged into a single request, sent
+    debounce seconds after the first of them. Requests are sent by a bounded pool of workers, and those that
+    fail upstream (timeouts, connection errors, 5xx) or hit an open circuit breaker are retried with
+    exponential backoff. Other errors, such as a 400 for an unknown itunes id, fail right away. When
+    state_path is given, pending submissions are saved there and picked up again by the next SubmissionQueue
+    using the same path.
+
+    Args:
+        index (PodcastIndex): Client used to send the requests.
+        debounce (float): Seconds to collect repeated submissions of an id. Default: 30
+        workers (int): Requests sent concurrently. Default: 4
+        max_attempts (int): Attempts per submission before giving up. Default: 3
+        retry_backoff (float): Seconds before the first retry, doubled for each further one. Default: 1
+        state_path (str, optional): File to persist pending submissions to.
+        save_interval (float): Seconds between saves of state_path while submissions arrive. Default: 1
+        on_result (callable, optional): Called with (method, id, outcome) once a submission succeeds or gives up.
+            The outcome includes the api response.
+        max_results (int): Outcomes kept in results, the oldest are dropped first. Default: 10000
+
+    Example:
+        submissions = SubmissionQueue(index, debounce=60, state_path="pending.json")
+        submissions.pub_notify(feedId)
+        ...
+        submissions.close()
+    """
+
+    def __init__(
+        self,
+        index,
+        debounce=30,
+        workers=4,
+        max_attempts=3,
+        retry_backoff=1.0,
+        state_path=None,
+        save_interval=1.0,
+        on_result=None,
+        max_results=10000,
+    ):
+        self.index = index
+        self.debounce = debounce
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.state_path = state_path
+        self.save_interval = save_interval
+        self.on_result = on_result
+        self.max_results = max_results
+
+        # Latest outcome per (method, id), without the response: {"status": "ok" or "failed", "attempts",
+        # "submissions", and "error" when failed}
+        self.results = OrderedDict()
+
+        self._pending = {}
+        self._in_flight = {}
+        self._dirty = False
+        self._last_save = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+        if state_path and os.path.exists(state_path):
+            self._load()
+
+        self._thread = threading.Thread(target=self._dispatch, name="submission-queue")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending) + len(self._in_flight)
+
+    def submit(self, method, id):
+        """
+        Queue a call to a write endpoint.
+
+        Args:
+            method (str): "pubNotifyUpdate" or "addByItunesId".
+            id (string or integer): Feed id or itunes id.
+
+        Raises:
+            ValueError: If the method is not a supported write endpoint.
+            RuntimeError: If the queue is closed.
+        """
+        if method not in SUBMIT_METHODS:
+            raise ValueError("Unsupported method: {}".format(method))
+
+        key = (method, str(id))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SubmissionQueue is closed")
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry["submissions"] += 1
+                return
+            self._pending[key] = {
+                "method": method,
+                "id": id,
+                "due": time.time() + self.debounce,
+                "attempts": 0,
+                "submissions": 1,
+            }
+            self._dirty = True
+            self._cond.notify_all()
+
+    def pub_notify(self, id):
+        """
+        Queue pubNotifyUpdate(id).
+        """
+        self.submit("pubNotifyUpdate", id)
+
+    def add_by_itunes_id(self, itunesId):
+        """
+        Queue addByItunesId(itunesId).
+        """
+        self.submit("addByItunesId", itunesId)
+
+    def flush(self, timeout=None):
+        """
+        Send everything pending now, ignoring the debounce window, and wait until nothing is left.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most.
+
+        Returns:
+            bool: True if the queue drained in time.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            now = time.time()
+            for entry in self._pending.values():
+                entry["due"] = min(entry["due"], now)
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, flush=True):
+        """
+        Stop the queue. Pending submissions are sent first when flush is True, and saved to state_path
+        either way.
+        """
+        if flush:
+            self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown()
+        self._save()
+
+    def _load(self):
+        with open(self.state_path) as f:
+            state = json.load(f)
+        for entry in state.get("pending", []):
+            self._pending[(entry["method"], str(entry["id"]))] = entry
+        logger.info("Loaded {} pending submissions from {}".format(len(self._pending), self.state_path))
+
+    def _save(self):
+        with self._cond:
+            self._dirty = False
+            self._last_save = time.time()
+            if not self.state_path:
+                return
+            # Entries being sent stay on disk until they finish, so a crash never loses a submission
+            entries = [dict(entry) for entry in list(self._pending.values()) + list(self._in_flight.values())]
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"pending": entries}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    now = time.time()
+                    # An id already being sent waits for that request to finish
+                    waiting = [
+                        (key, entry) for key, entry in self._pending.items() if key not in self._in_flight
+                    ]
+                    due = [key for key, entry in waiting if entry["due"] <= now]
+                    next_save = self._last_save + self.save_interval if self._dirty else now + 1
+                    if due or next_save <= now:
+                        break
+                    next_due = min([entry["due"] for _, entry in waiting] + [next_save])
+                    self._cond.wait(max(0.0, next_due - now))
+
+                batch = []
+                for key in due:
+                    entry = self._pending.pop(key)
+                    self._in_flight[key] = entry
+                    batch.append((key, entry))
+
+            self._save()
+            for key, entry in batch:
+                self._executor.submit(self._send, key, entry)
+
+    def _send(self, key, entry):
+        entry["attempts"] += 1
+        outcome = None
+        try:
+            response = getattr(self.index, entry["method"])(entry["id"])
+            outcome = {"status": "ok", "response": response}
+        except Exception as e:
+            # An open breaker only means the endpoint is resting, the submission goes out once it closes
+            retryable = is_upstream_failure(e) or isinstance(e, CircuitOpenError)
+            if entry["attempts"] < self.max_attempts and retryable:
+                delay = self.retry_backoff * 2 ** (entry["attempts"] - 1)
+                logger.warning("Submitting {} failed, retrying in {}s: {}".format(key, delay, e))
+            else:
+                outcome = {"status": "failed", "error": repr(e)}
+
+        with self._cond:
+            del self._in_flight[key]
+            if outcome is None:
+                # Retry, merged with anything submitted for the same id in the meantime
+                queued = self._pending.get(key)
+                entry["due"] = time.time() + delay
+                if queued is not None:
+                    entry["submissions"] += queued["submissions"]
+                self._pending[key] = entry
+            else:
+                outcome["attempts"] = entry["attempts"]
+                outcome["submissions"] = entry["submissions"]
+                self.results.pop(key, None)
+                self.results[key] = dict((k, v) for k, v in outcome.items() if k != "response")
+                while len(self.results) > self.max_results:
+                    self.results.popitem(last=False)
+            self._dirty = True
+            self._cond.notify_all()
+
+        if outcome is not None and self.on_result is not None:
+            try:
+                self.on_result(entry["method"], entry["id"], outcome)
+            except Exception:
+                logger.exception("on_result callback failed")
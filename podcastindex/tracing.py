@@ -0,0 +1,198 @@
+import collections
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer:
+    """
+    Tracer that records nothing. This is the default.
+    """
+
+    def span(self, name, **attributes):
+        return _NOOP_SPAN
+
+
+class RecordingTracer:
+    """
+    Tracer keeping finished spans in memory, for offline analysis of where a call spends its time.
+
+    Args:
+        max_spans (int): Number of most recent spans kept. Default: 100000
+    """
+
+    def __init__(self, max_spans=100000):
+        self.spans = collections.deque(maxlen=max_spans)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        stack = self._local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start
+            stack.pop()
+            with self._lock:
+                self.spans.append(
+                    {"name": name, "parent": parent, "start": start, "duration": duration, "attributes": attributes}
+                )
+
+    def summary(self):
+        """
+        Aggregate the recorded spans by name.
+
+        Returns:
+            Dict[str, Dict]: count, total and max duration in seconds, keyed by span name.
+        """
+        result = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stats = result.setdefault(span["name"], {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += span["duration"]
+            stats["max"] = max(stats["max"], span["duration"])
+        return result
+
+
+class OpenTelemetryTracer:
+    """
+    Tracer emitting OpenTelemetry spans through the globally configured tracer provider.
+
+    Raises:
+        ImportError: If opentelemetry-api is not installed.
+    """
+
+    def __init__(self, name="podcastindex"):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError("OpenTelemetryTracer requires the 'opentelemetry-api' package")
+        self._tracer = trace.get_tracer(name)
+
+    def span(self, name, **attributes):
+        return self._tracer.start_as_current_span(name, attributes=attributes)
+
+
+def get_tracer(tracer=None):
+    """
+    Resolve the 'tracer' config value.
+
+    Args:
+        tracer (object or str, optional): A tracer instance, "opentelemetry", or None for no tracing.
+
+    Returns:
+        object: Tracer with a span(name, **attributes) context manager.
+    """
+    if tracer is None:
+        return NoopTracer()
+    if tracer == "opentelemetry":
+        return OpenTelemetryTracer()
+    if isinstance(tracer, str):
+        raise ValueError("Unknown tracer: {}".format(tracer))
+    return tracer
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all running threads at a fixed interval from a background thread.
+
+    Stacks are aggregated in the "folded" format understood by flamegraph.pl, speedscope and most other
+    flamegraph tools: one line per distinct stack, frames separated by ";" and followed by the sample count.
+
+    Args:
+        interval (float): Seconds between samples. Default: 0.005
+        max_depth (int): Deepest frames kept per stack. Default: 64
+
+    Example:
+        with SamplingProfiler() as profiler:
+            run_backfill()
+        profiler.dump("backfill.folded")
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        if self._thread is not None:
+            raise RuntimeError("SamplingProfiler is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _frame_name(self, frame):
+        code = frame.f_code
+        return "{}:{}".format(os.path.basename(code.co_filename), code.co_name)
+
+    def _run(self):
+        own_id = threading.current_thread().ident
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    names.append(self._frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def top(self, n=10):
+        """
+        Functions sampled most often at the top of a stack.
+
+        Returns:
+            List[Tuple[str, int]]: (frame, samples) pairs, most frequent first.
+        """
+        leaves = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def dump(self, path):
+        """
+        Write the collected stacks in folded format.
+
+        Args:
+            path (str): File to write.
+        """
+        with open(path, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write("{} {}\n".format(stack, count))
@@ -0,0 +1,208 @@
+import logging
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util import connection
+from urllib3.util.wait import wait_for_read
+
+logger = logging.getLogger(__name__)
+
+
+class DNSCache:
+    """
+    Cache of host name lookups, each kept for ttl seconds.
+
+    Args:
+        ttl (float): Seconds a resolved address is reused. Default: 300
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.lookups = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        """
+        Resolve host, from the cache when the last lookup is recent enough.
+
+        Raises:
+            socket.gaierror: When the host can not be resolved.
+
+        Returns:
+            List[Tuple[str, int]]: Addresses to try, in order.
+        """
+        key = (host, port)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        addresses = []
+        for info in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM):
+            if info[4][:2] not in addresses:
+                addresses.append(info[4][:2])
+        with self._lock:
+            self.lookups += 1
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def invalidate(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+class _CachedDNSConnection(object):
+    dns_cache = None
+
+    def _new_conn(self):
+        # Connect to the cached address; the host name is still used for SNI and certificate checks
+        try:
+            addresses = self.dns_cache.resolve(self._dns_host, self.port)
+        except socket.gaierror as e:
+            raise NewConnectionError(self, "Failed to resolve {}: {}".format(self._dns_host, e))
+
+        error = None
+        for address in addresses:
+            try:
+                return connection.create_connection(
+                    address, self.timeout, source_address=self.source_address, socket_options=self.socket_options
+                )
+            except OSError as e:
+                error = e
+        self.dns_cache.invalidate(self._dns_host, self.port)
+        if isinstance(error, socket.timeout):
+            raise ConnectTimeoutError(self, "Connection to {} timed out".format(self._dns_host))
+        raise NewConnectionError(self, "Failed to establish a new connection: {}".format(error))
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections resolve host names through a DNSCache.
+
+    Args:
+        dns_cache (DNSCache, optional): Cache to resolve with. Default: resolve on every connection
+        **kwargs: Passed to HTTPAdapter, e.g. pool_maxsize.
+    """
+
+    def __init__(self, dns_cache=None, **kwargs):
+        self.dns_cache = dns_cache
+        super(PooledAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PooledAdapter, self).init_poolmanager(*args, **kwargs)
+        if getattr(self, "dns_cache", None) is None:
+            return
+        attributes = {"dns_cache": self.dns_cache}
+        http = type("HTTPConnection", (_CachedDNSConnection, HTTPConnection), attributes)
+        https = type("HTTPSConnection", (_CachedDNSConnection, HTTPSConnection), attributes)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("HTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http}),
+            "https": type("HTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": https}),
+        }
+
+
+def create_session(pool_size=10, dns_cache=None):
+    """
+    Create a requests Session with a connection pool of pool_size kept-alive connections per host.
+
+    Args:
+        pool_size (int): Connections kept open per host. Default: 10
+        dns_cache (DNSCache, optional): Cache to resolve host names with.
+
+    Returns:
+        requests.Session: The session.
+    """
+    session = requests.Session()
+    adapter = PooledAdapter(dns_cache=dns_cache, pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _connection_pool(session, url):
+    # The pool requests itself will use for url, which depends on the tls settings of the session
+    adapter = session.get_adapter(url)
+    request = requests.Request("POST", url).prepare()
+    settings = session.merge_environment_settings(url, {}, None, session.verify, session.cert)
+    if hasattr(adapter, "get_connection_with_tls_context"):
+        return adapter.get_connection_with_tls_context(
+            request, settings["verify"], settings["proxies"], settings["cert"]
+        )
+    return adapter.get_connection(url, settings["proxies"])
+
+
+def _drain(conn, wait):
+    # A TLS 1.3 server sends its session tickets after the handshake. Left unread they make the idle socket
+    # look readable, and the pool would throw the connection away as dropped on its first use.
+    sock = conn.sock
+    if not isinstance(sock, ssl.SSLSocket):
+        return True
+    timeout = sock.gettimeout()
+    sock.setblocking(False)
+    try:
+        # Servers usually send two tickets, the second one can be held back by delayed acks
+        while wait_for_read(sock, timeout=wait):
+            try:
+                while True:
+                    if not sock.recv(1024):
+                        return False
+            except ssl.SSLWantReadError:
+                pass
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.settimeout(timeout)
+
+
+def warm_up(session, url, connections, timeout=5):
+    """
+    Open connections to the host of url ahead of time and leave them in the session's pool, so the first
+    requests skip the name lookup, tcp connect and tls handshake.
+
+    Args:
+        session (requests.Session): Session to warm up.
+        url (str): Any url on the host.
+        connections (int): Connections to open, at most the pool size.
+        timeout (float): Seconds to wait for each connection. Default: 5
+
+    Returns:
+        int: Connections opened. Failures are logged, not raised.
+    """
+    pool = _connection_pool(session, url)
+    conns = [pool._get_conn() for _ in range(connections)]
+
+    def open_connection(conn):
+        conn.timeout = timeout
+        start = time.time()
+        try:
+            conn.connect()
+        except Exception as e:
+            logger.warning("Could not pre-open a connection to {}: {}".format(url, e))
+            conn.close()
+            return False
+        # Session tickets arrive about one round trip after the handshake, which took at least two
+        if not _drain(conn, min(time.time() - start, timeout)):
+            conn.close()
+            return False
+        return True
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, connections)) as executor:
+            opened = sum(executor.map(open_connection, conns))
+    finally:
+        for conn in conns:
+            conn.timeout = pool.timeout.connect_timeout
+            pool._put_conn(conn)
+    logger.debug("Pre-opened {} of {} connections to {}".format(opened, connections, url))
+    return opened
@@ -0,0 +1,387 @@
+import bisect
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from .scheduler import BULK
+
+logger = logging.getLogger(__name__)
+
+# Log record: kind, filter id, timestamp, payload length
+_RECORD = struct.Struct("<BIdI")
+
+FILTER, KEYFRAME, DELTA, TITLES = 0, 1, 2, 3
+
+
+# trendingPodcasts arguments that identify a series of snapshots
+FILTER_ARGS = ("max", "lang", "categories", "not_categories")
+
+
+def _filter_key(max=None, lang=None, categories=None, not_categories=None):
+    # Filters are kept exactly as passed, since the client sends different requests for e.g. "a,b" and ["a", "b"]
+    filters = {"max": max, "lang": lang, "categories": categories, "not_categories": not_categories}
+    return json.dumps(dict((name, value) for name, value in filters.items() if value is not None), sort_keys=True)
+
+
+def _write_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _encode(ranking, previous):
+    """
+    Encode a ranking, as a delta against previous when given. In a delta every feed that was already ranked is
+    stored as its move relative to its previous position, which is a small number for stable rankings.
+    """
+    out = bytearray()
+    _write_varint(out, len(ranking))
+    positions = dict((feed_id, i) for i, feed_id in enumerate(previous)) if previous is not None else {}
+    for i, feed_id in enumerate(ranking):
+        j = positions.get(feed_id)
+        if j is None:
+            _write_varint(out, (feed_id << 1) | 1)
+        else:
+            move = j - i
+            _write_varint(out, ((move << 1) ^ (move >> 63)) << 1)
+    return zlib.compress(bytes(out))
+
+
+def _decode(payload, previous):
+    data = bytearray(zlib.decompress(payload))
+    count, pos = _read_varint(data, 0)
+    ranking = []
+    for i in range(count):
+        value, pos = _read_varint(data, pos)
+        if value & 1:
+            ranking.append(value >> 1)
+        else:
+            zigzag = value >> 1
+            move = (zigzag >> 1) ^ -(zigzag & 1)
+            ranking.append(previous[i + move])
+    return ranking
+
+
+class _Series:
+    """
+    Snapshots of one filter combination: a time index, where each snapshot lives in the log, and for every
+    feed the snapshots it appeared in along with its rank.
+    """
+
+    def __init__(self, filters):
+        self.filters = filters
+        self.timestamps = array("d")
+        self.offsets = array("Q")
+        self.keyframes = array("I")
+        self.kinds = array("B")
+        self.ranks = {}
+        self.last = None
+
+    def add(self, kind, timestamp, offset, ranking):
+        number = len(self.timestamps)
+        self.timestamps.append(timestamp)
+        self.offsets.append(offset)
+        self.kinds.append(kind)
+        if kind == KEYFRAME:
+            self.keyframes.append(number)
+        for rank, feed_id in enumerate(ranking, 1):
+            entry = self.ranks.get(feed_id)
+            if entry is None:
+                entry = self.ranks[feed_id] = (array("I"), array("H"))
+            entry[0].append(number)
+            entry[1].append(rank)
+        self.last = ranking
+
+    def at(self, timestamp):
+        """
+        Number of the last snapshot taken at or before timestamp, or -1.
+        """
+        return bisect.bisect_right(self.timestamps, timestamp) - 1
+
+
+class TrendingRecorder:
+    """
+    Record trendingPodcasts snapshots for many filter combinations and query how rankings changed.
+
+    Only the ranked feed ids are kept. Each snapshot is stored as a delta against the previous one of the
+    same combination, with a full keyframe every keyframe_interval snapshots, in a single append-only log.
+    Opening the log builds a time index and, for every feed, the list of snapshots it was ranked in. So
+    rank_history() is a lookup and movers() decodes two snapshots rather than replaying every one.
+
+    Args:
+        path (str): Log file, created if needed.
+        keyframe_interval (int): Snapshots between full keyframes. Default: 32
+
+    Example:
+        recorder = TrendingRecorder("trending.log")
+        recorder.poll(index, [{"lang": ["en"], "max": 100}, {"lang": ["en"], "categories": ["News"], "max": 100}])
+        recorder.rank_history(feedId, lang=["en"], max=100)
+        recorder.movers(time.time() - 86400, lang=["en"], max=100)
+    """
+
+    def __init__(self, path, keyframe_interval=32):
+        if keyframe_interval <= 0:
+            raise ValueError("keyframe_interval must be positive")
+
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.titles = {}
+        self._series = []
+        self._by_key = {}
+        self._lock = threading.RLock()
+        self._load()
+        self._log = open(path, "ab")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            kind, series_id, timestamp, length = _RECORD.unpack_from(data, pos)
+            start = pos + _RECORD.size
+            if start + length > len(data):
+                break
+            payload = data[start:start + length]
+            if kind == FILTER:
+                filters = json.loads(payload.decode("utf-8"))
+                self._by_key[_filter_key(**filters)] = len(self._series)
+                self._series.append(_Series(filters))
+            elif kind == TITLES:
+                self.titles.update((int(k), v) for k, v in json.loads(payload.decode("utf-8")).items())
+            else:
+                series = self._series[series_id]
+                ranking = _decode(payload, series.last if kind == DELTA else None)
+                series.add(kind, timestamp, pos, ranking)
+            pos = start + length
+
+        if pos < len(data):
+            # Drop a record torn by a crash so new records are appended after the last complete one
+            logger.warning("Ignoring {} bytes of incomplete data at the end of {}".format(len(data) - pos, self.path))
+            with open(self.path, "r+b") as f:
+                f.truncate(pos)
+
+    def _append(self, kind, series_id, timestamp, payload):
+        offset = self._log.tell()
+        self._log.write(_RECORD.pack(kind, series_id, timestamp, len(payload)) + payload)
+        return offset
+
+    def _get_series(self, filters, create=False):
+        key = _filter_key(**filters)
+        series_id = self._by_key.get(key)
+        if series_id is None:
+            if not create:
+                raise KeyError("No snapshots recorded for {}".format(key))
+            series_id = self._by_key[key] = len(self._series)
+            normalized = json.loads(key)
+            self._series.append(_Series(normalized))
+            self._append(FILTER, series_id, 0.0, key.encode("utf-8"))
+        return series_id, self._series[series_id]
+
+    def record(self, response, timestamp=None, max=None, lang=None, categories=None, not_categories=None):
+        """
+        Store a snapshot.
+
+        Args:
+            response (Dict or List[Dict]): trendingPodcasts response, or its list of feeds.
+            timestamp (float, optional): When the snapshot was taken. Default: now
+            max, lang, categories, not_categories: Arguments the snapshot was taken with, as passed to
+                trendingPodcasts. Each distinct combination is its own series.
+        """
+        feeds = (response.get("feeds") or []) if isinstance(response, dict) else response
+        ranking = [int(feed["id"]) for feed in feeds]
+        timestamp = time.time() if timestamp is None else timestamp
+        filters = {"max": max, "lang": lang, "categories": categories, "not_categories": not_categories}
+
+        with self._lock:
+            series_id, series = self._get_series(filters, create=True)
+            if len(series.timestamps) and timestamp < series.timestamps[-1]:
+                raise ValueError("Snapshots must be recorded in time order")
+
+            new_titles = dict(
+                (str(feed["id"]), feed["title"]) for feed in feeds
+                if feed.get("title") and self.titles.get(int(feed["id"])) != feed["title"]
+            )
+            if new_titles:
+                self._append(TITLES, series_id, timestamp, json.dumps(new_titles).encode("utf-8"))
+                self.titles.update((int(k), v) for k, v in new_titles.items())
+
+            keyframe = series.last is None or len(series.timestamps) - series.keyframes[-1] >= self.keyframe_interval
+            kind = KEYFRAME if keyframe else DELTA
+            offset = self._append(kind, series_id, timestamp, _encode(ranking, None if keyframe else series.last))
+            self._log.flush()
+            series.add(kind, timestamp, offset, ranking)
+
+    def poll(self, index, filters, workers=4):
+        """
+        Take a snapshot of every filter combination now.
+
+        Args:
+            index (PodcastIndex): Client used to call trendingPodcasts.
+            filters (List[Dict]): Keyword arguments for trendingPodcasts, one dict per combination, e.g.
+                {"lang": ["en"], "categories": ["News"], "max": 100}.
+            workers (int): Combinations fetched concurrently. Default: 4
+
+        Raises:
+            ValueError: Before anything is fetched, if a combination has an argument other than max, lang,
+                categories and not_categories (since is not supported, snapshots are taken now), or a string for
+                lang, categories or not_categories, which trendingPodcasts would split into characters.
+        """
+        filters = list(filters)
+        for kwargs in filters:
+            unknown = set(kwargs) - set(FILTER_ARGS)
+            if unknown:
+                raise ValueError("Unknown trendingPodcasts arguments: {}".format(", ".join(sorted(unknown))))
+            for name in ("lang", "categories", "not_categories"):
+                if isinstance(kwargs.get(name), str):
+                    raise ValueError("{} must be a list, e.g. [{!r}]".format(name, kwargs[name]))
+
+        def fetch(kwargs):
+            with index.lane(BULK):
+                return index.trendingPodcasts(**kwargs)
+
+        timestamp = time.time()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for kwargs, response in zip(filters, executor.map(fetch, filters)):
+                self.record(response, timestamp, **kwargs)
+
+    def filters(self):
+        """
+        Filter combinations with recorded snapshots.
+
+        Returns:
+            List[Dict]: Filters as they were recorded, which can be passed back to poll() and the queries.
+        """
+        return [dict(series.filters) for series in self._series]
+
+    def _ranking(self, series, number):
+        # Decode from the closest keyframe at or before the snapshot
+        start = series.keyframes[bisect.bisect_right(series.keyframes, number) - 1]
+        ranking = None
+        with self._lock, open(self.path, "rb") as f:
+            for n in range(start, number + 1):
+                f.seek(series.offsets[n])
+                length = _RECORD.unpack(f.read(_RECORD.size))[3]
+                ranking = _decode(f.read(length), ranking if series.kinds[n] == DELTA else None)
+        return ranking
+
+    def snapshot(self, at=None, **filters):
+        """
+        Ranked feed ids of the last snapshot taken at or before a time.
+
+        Args:
+            at (float, optional): Unix timestamp. Default: the latest snapshot
+            **filters: Filter combination, as passed to trendingPodcasts.
+
+        Raises:
+            KeyError: If nothing was recorded for the filter combination.
+
+        Returns:
+            List[int]: Feed ids, best ranked first. Empty when there was no snapshot yet.
+        """
+        with self._lock:
+            _, series = self._get_series(filters)
+            if at is None:
+                return list(series.last or [])
+            number = series.at(at)
+        return self._ranking(series, number) if number >= 0 else []
+
+    def rank_history(self, feed_id, since=None, until=None, **filters):
+        """
+        Rank of a feed in every snapshot of a filter combination.
+
+        Args:
+            feed_id (int): Feed to follow.
+            since (float, optional): Only snapshots taken at or after this unix timestamp.
+            until (float, optional): Only snapshots taken at or before this unix timestamp.
+            **filters: Filter combination, as passed to trendingPodcasts.
+
+        Raises:
+            KeyError: If nothing was recorded for the filter combination.
+
+        Returns:
+            List[Tuple[float, int]]: (timestamp, rank) per snapshot, rank being None when the feed was not ranked.
+        """
+        with self._lock:
+            _, series = self._get_series(filters)
+            first = 0 if since is None else bisect.bisect_left(series.timestamps, since)
+            last = len(series.timestamps) if until is None else series.at(until) + 1
+            numbers, ranks = series.ranks.get(feed_id, ((), ()))
+            i, j = bisect.bisect_left(numbers, first), bisect.bisect_left(numbers, last)
+            present = dict(zip(numbers[i:j], ranks[i:j]))
+            return [(series.timestamps[n], present.get(n)) for n in range(first, last)]
+
+    def movers(self, since, until=None, limit=10, **filters):
+        """
+        Feeds whose rank changed the most between two times.
+
+        Args:
+            since (float): Unix timestamp to compare from, the last snapshot at or before it is used (or the first
+                snapshot when there is none).
+            until (float, optional): Unix timestamp to compare to. Default: the latest snapshot
+            limit (int): Number of feeds to return. Default: 10
+            **filters: Filter combination, as passed to trendingPodcasts.
+
+        Raises:
+            KeyError: If nothing was recorded for the filter combination.
+
+        Returns:
+            List[Dict]: feedId, title, rank, previous_rank and change, biggest moves first. A rank is None when the
+                feed was not ranked at that time, and counts as one past the end of the list for change.
+        """
+        with self._lock:
+            _, series = self._get_series(filters)
+            if not len(series.timestamps):
+                return []
+            before = max(series.at(since), 0)
+            after = len(series.timestamps) - 1 if until is None else series.at(until)
+        old = self._ranking(series, before)
+        new = self._ranking(series, after) if after >= 0 else []
+
+        old_ranks = dict((feed_id, rank) for rank, feed_id in enumerate(old, 1))
+        new_ranks = dict((feed_id, rank) for rank, feed_id in enumerate(new, 1))
+        moves = []
+        for feed_id in set(old_ranks) | set(new_ranks):
+            rank = new_ranks.get(feed_id)
+            previous = old_ranks.get(feed_id)
+            change = (len(old) + 1 if previous is None else previous) - (len(new) + 1 if rank is None else rank)
+            if change:
+                moves.append({
+                    "feedId": feed_id,
+                    "title": self.titles.get(feed_id),
+                    "rank": rank,
+                    "previous_rank": previous,
+                    "change": change,
+                })
+        moves.sort(key=lambda move: (-abs(move["change"]), move["feedId"]))
+        return moves[:limit]
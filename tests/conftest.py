@@ -0,0 +1,56 @@
+import json
+
+import pytest
+import requests
+
+import podcastindex.podcastindex
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.status_code = status_code
+        self.text = json.dumps(body)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError("{} Error".format(self.status_code), response=self)
+
+
+class FakeApi:
+    """
+    Stand in for api.podcastindex.org. Handlers are registered per endpoint path and receive the payload.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.calls = []
+        self.headers = []
+
+    def route(self, path, handler):
+        self.handlers[path] = handler
+
+    def calls_to(self, path):
+        return [payload for called_path, payload in self.calls if called_path == path]
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        path = url.split("/api/1.0", 1)[1]
+        self.calls.append((path, dict(data)))
+        self.headers.append(headers)
+        result = self.handlers[path](dict(data))
+        if isinstance(result, FakeResponse):
+            return result
+        return FakeResponse(result)
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    api = FakeApi()
+    monkeypatch.setattr(
+        podcastindex.podcastindex.requests.Session, "post", lambda session, url, **kwargs: api.post(url, **kwargs)
+    )
+    return api
+
+
+@pytest.fixture
+def config():
+    return {"api_key": "key", "api_secret": "secret"}
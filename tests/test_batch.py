@@ -0,0 +1,68 @@
+import logging
+
+import podcastindex
+from podcastindex.batch import resolve_episode_guids
+from tests.conftest import FakeResponse
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+# feed id -> guids of its episodes
+FEEDS = dict((feed, ["{}-{}".format(feed, n) for n in range(50)]) for feed in range(1, 6))
+
+
+def _episodes_by_feed_id(payload):
+    if payload["id"] not in FEEDS:
+        return FakeResponse({"status": "false"}, status_code=400)
+    guids = FEEDS[payload["id"]][: payload["max"]]
+    return {"status": "true", "items": [{"guid": guid, "feedId": payload["id"]} for guid in guids]}
+
+
+def _episode_by_guid(payload):
+    feed = payload["feedid"]
+    if payload["guid"] in FEEDS.get(feed, []):
+        return {"status": "true", "episode": {"guid": payload["guid"], "feedId": feed}}
+    return FakeResponse({"status": "false"}, status_code=400)
+
+
+def test_resolve_groups_by_feed(fake_api, config):
+    fake_api.route("/episodes/byfeedid", _episodes_by_feed_id)
+    fake_api.route("/episodes/byguid", _episode_by_guid)
+    index = podcastindex.init(config)
+
+    pairs = [(guid, feed) for feed in (1, 2, 3) for guid in FEEDS[feed][:20]]
+    pairs.append(("5-7", 5))
+    results = resolve_episode_guids(index, pairs)
+
+    assert len(results) == len(pairs)
+    assert all(results[(guid, feed)]["guid"] == guid for guid, feed in pairs)
+    assert len(fake_api.calls_to("/episodes/byfeedid")) == 3, "One page per feed with several guids"
+    assert len(fake_api.calls_to("/episodes/byguid")) == 1, "Single guids are looked up directly"
+
+
+def test_resolve_falls_back_for_misses(fake_api, config):
+    fake_api.route("/episodes/byfeedid", _episodes_by_feed_id)
+    fake_api.route("/episodes/byguid", _episode_by_guid)
+    index = podcastindex.init(config)
+
+    pairs = [("1-0", 1), ("1-45", 1), ("1-missing", 1)]
+    results = resolve_episode_guids(index, pairs, max_results=10)
+
+    assert results[("1-0", 1)]["guid"] == "1-0"
+    assert results[("1-45", 1)]["guid"] == "1-45", "Episodes beyond the fetched page are looked up one by one"
+    assert results[("1-missing", 1)] is None
+    assert sorted(payload["guid"] for payload in fake_api.calls_to("/episodes/byguid")) == ["1-45", "1-missing"]
+
+
+def test_resolve_unknown_feed(fake_api, config):
+    fake_api.route("/episodes/byfeedid", _episodes_by_feed_id)
+    fake_api.route("/episodes/byguid", _episode_by_guid)
+    index = podcastindex.init(config)
+
+    pairs = [("x", 999), ("y", 999), ("1-0", 1), ("1-1", 1)]
+    results = resolve_episode_guids(index, pairs)
+
+    assert results[("x", 999)] is None
+    assert results[("y", 999)] is None
+    assert results[("1-0", 1)]["guid"] == "1-0", "An unknown feed does not fail the other pairs"
+    assert len(fake_api.calls_to("/episodes/byguid")) == 0
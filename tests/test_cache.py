@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+import podcastindex
+from podcastindex.cache import TTLCache
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def test_ttl_cache_lookup():
+    cache = TTLCache(2, ttl=0.05, stale_ttl=0.1)
+    cache.set("a", 1)
+    assert cache.lookup("a") == (1, True)
+
+    time.sleep(0.06)
+    assert cache.lookup("a") == (1, False), "Expired entries are served as stale within the grace period"
+    assert cache.get("a") is None
+
+    time.sleep(0.1)
+    assert cache.lookup("a") == (None, False)
+
+    for key in "abc":
+        cache.set(key, key)
+    assert len(cache) == 2
+
+
+def test_response_cache(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", lambda payload: {"status": "true", "feed": {"id": payload["id"]}})
+    fake_api.route("/episodes/random", lambda payload: {"status": "true", "episodes": [{"id": 1}]})
+    config["cache_ttl"] = 60
+    index = podcastindex.init(config)
+
+    first = index.podcastByFeedId(1)
+    first["feed"]["id"] = "mutated"
+    assert index.podcastByFeedId(1)["feed"]["id"] == 1, "Cached responses should not be shared with callers"
+    assert len(fake_api.calls_to("/podcasts/byfeedid")) == 1
+
+    index.randomEpisodes(max=1)
+    index.randomEpisodes(max=1)
+    assert len(fake_api.calls_to("/episodes/random")) == 2, "Random episodes must never be cached"
+
+    assert index.invalidate_cache("podcastByFeedId", 1)
+    index.podcastByFeedId(1)
+    assert len(fake_api.calls_to("/podcasts/byfeedid")) == 2
+
+
+def test_stale_while_revalidate(fake_api, config):
+    version = [0]
+    release = threading.Event()
+
+    def trending(payload):
+        if version[0] > 0:
+            release.wait(5)
+        version[0] += 1
+        return {"status": "true", "feeds": [{"id": version[0]}]}
+
+    fake_api.route("/podcasts/trending", trending)
+    config["cache_ttl"] = 0.05
+    config["cache_stale_ttl"] = 60
+    index = podcastindex.init(config)
+
+    assert index.trendingPodcasts()["feeds"][0]["id"] == 1
+    time.sleep(0.06)
+
+    # Stale results come back immediately while a single refresh runs in the background
+    start = time.time()
+    for _ in range(5):
+        assert index.trendingPodcasts()["feeds"][0]["id"] == 1
+    assert time.time() - start < 1
+    release.set()
+
+    index._refresh_executor.shutdown(wait=True)
+    assert len(fake_api.calls_to("/podcasts/trending")) == 2, "Refreshes should be deduplicated per key"
+    assert index.trendingPodcasts()["feeds"][0]["id"] == 2
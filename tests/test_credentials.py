@@ -0,0 +1,62 @@
+import hashlib
+import logging
+from collections import Counter
+
+import podcastindex
+from podcastindex.credentials import CredentialPool
+from tests.conftest import FakeResponse
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+credentials = [
+    {"api_key": "key-a", "api_secret": "secret-a"},
+    {"api_key": "key-b", "api_secret": "secret-b"},
+    {"api_key": "key-c", "api_secret": "secret-c"},
+]
+
+
+def test_pool_picks_least_loaded():
+    pool = CredentialPool(credentials)
+    held = [pool.acquire() for _ in range(3)]
+    assert sorted(c.api_key for c in held) == ["key-a", "key-b", "key-c"]
+
+    for credential in held:
+        pool.release(credential, 200)
+    assert set(stats["in_flight"] for stats in pool.stats().values()) == {0}
+
+
+def test_requests_are_spread_across_keys(fake_api):
+    fake_api.route("/podcasts/byfeedid", lambda payload: {"status": "true", "feed": {"id": payload["id"]}})
+    index = podcastindex.init({"credentials": credentials})
+
+    for feed_id in range(30):
+        index.podcastByFeedId(feed_id)
+
+    used = Counter(headers["X-Auth-Key"] for headers in fake_api.headers)
+    assert used == {"key-a": 10, "key-b": 10, "key-c": 10}
+
+    secrets = dict((c["api_key"], c["api_secret"]) for c in credentials)
+    for headers in fake_api.headers:
+        data = headers["X-Auth-Key"] + secrets[headers["X-Auth-Key"]] + headers["X-Auth-Date"]
+        assert headers["Authorization"] == hashlib.sha1(data.encode()).hexdigest(), "Signed with the wrong secret"
+
+
+def test_throttled_key_is_quarantined(fake_api):
+    def lookup(payload):
+        if fake_api.headers[-1]["X-Auth-Key"] == "key-a":
+            return FakeResponse({"status": "false"}, status_code=429)
+        return {"status": "true", "feed": {"id": payload["id"]}}
+
+    fake_api.route("/podcasts/byfeedid", lookup)
+    index = podcastindex.init({"credentials": credentials})
+
+    errors = 0
+    for feed_id in range(20):
+        try:
+            index.podcastByFeedId(feed_id)
+        except Exception:
+            errors += 1
+
+    assert errors == 1, "Only the first request on the throttled key should fail"
+    assert index.credential_pool.stats()["key-a"]["quarantined"]
@@ -0,0 +1,68 @@
+import logging
+
+import pytest
+
+import podcastindex
+from podcastindex.dedup import BloomFilter, FingerprintSet, fingerprint
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def _episode(id, guid=None, feedId=1, url=None):
+    return {"id": id, "guid": guid or "guid-{}".format(id), "feedId": feedId,
+            "enclosureUrl": url or "https://example.com/{}.mp3".format(id)}
+
+
+def test_fingerprint_set():
+    fps = FingerprintSet(capacity=4)
+    keys = [fingerprint("key-{}".format(i)) for i in range(5000)]
+    for fp in keys:
+        assert fps.add(fp)
+    assert len(fps) == 5000
+    assert all(fp in fps for fp in keys)
+    assert not fps.add(keys[0])
+    assert fingerprint("missing") not in fps
+
+
+def test_bloom_filter_error_rate():
+    bloom = BloomFilter(10000, error_rate=0.01)
+    for i in range(10000):
+        bloom.add(fingerprint("in-{}".format(i)))
+
+    assert all(fingerprint("in-{}".format(i)) in bloom for i in range(10000))
+    false_positives = sum(fingerprint("out-{}".format(i)) in bloom for i in range(10000))
+    assert false_positives < 300, "False positive rate should stay close to the configured 1%"
+
+
+def test_deduplicator_matches_any_key():
+    dedup = podcastindex.EpisodeDeduplicator()
+    assert dedup.add(_episode(1))
+    assert not dedup.add(_episode(1)), "Same id should be a duplicate"
+    assert not dedup.add(_episode(2, url="https://example.com/1.mp3")), "Same enclosure should be a duplicate"
+    assert not dedup.add(_episode(3, guid="guid-1")), "Same guid in the same feed should be a duplicate"
+    assert dedup.add(_episode(4, guid="guid-1", feedId=2)), "Guids are only unique within a feed"
+
+    episodes = [_episode(i) for i in (4, 5, 5, 6)]
+    assert [e["id"] for e in dedup.filter(episodes)] == [5, 6]
+
+
+def test_deduplicator_bounded_with_bloom(tmpdir):
+    dedup = podcastindex.EpisodeDeduplicator(max_exact_keys=100, bloom_capacity=10000)
+    for i in range(1000):
+        dedup.add(_episode(i))
+
+    assert len(dedup._exact) <= 100, "Exact set should be bounded"
+    assert dedup.seen(_episode(5)), "Old episodes are still found through the bloom filter"
+
+    path = str(tmpdir.join("dedup.bin"))
+    dedup.save(path)
+    loaded = podcastindex.EpisodeDeduplicator.load(path)
+    assert loaded.seen(_episode(5))
+    assert loaded.seen(_episode(999))
+    assert not loaded.seen(_episode(5000))
+
+
+def test_deduplicator_requires_bloom_for_bound():
+    with pytest.raises(ValueError):
+        podcastindex.EpisodeDeduplicator(max_exact_keys=100)
@@ -0,0 +1,58 @@
+import inspect
+import logging
+
+import pytest
+
+import podcastindex
+from podcastindex.endpoints import ENDPOINTS
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+# (method, args, kwargs, path, payload) as the hand written methods used to send them
+CALLS = [
+    ("search", ("This American Life",), {"clean": True}, "/search/byterm", {"q": "This American Life", "clean": 1}),
+    ("podcastByFeedUrl", ("http://a/feed",), {}, "/podcasts/byfeedurl", {"url": "http://a/feed"}),
+    ("podcastByItunesId", (201671138,), {}, "/podcasts/byitunesid", {"id": 201671138}),
+    ("episodesByFeedId", (745287,), {"since": -3600, "fulltext": True}, "/episodes/byfeedid",
+     {"id": 745287, "max": 10, "since": -3600, "fulltext": True}),
+    ("episodesByItunesId", (1434243584,), {}, "/episodes/byitunesid",
+     {"id": 1434243584, "max": 10, "fulltext": True}),
+    ("episodeByGuid", ("guid",), {"feedid": 1}, "/episodes/byguid", {"guid": "guid", "feedid": 1}),
+    ("randomEpisodes", (), {"max": 3, "lang": "en"}, "/episodes/random", {"pretty": 1, "max": 3, "lang": "en"}),
+    ("recentEpisodes", (), {"max": 5, "excluding": "trump", "before_episode_id": 12},
+     "/recent/episodes", {"max": 5, "excludeString": "trump", "before": 12}),
+    ("trendingPodcasts", (), {"lang": ["en", "es"], "categories": ["News", 55]}, "/podcasts/trending",
+     {"max": 10, "lang": "en,es", "cat": "News,55"}),
+    ("newFeeds", (), {"feed_id": 7, "desc": True}, "/recent/feeds", {"max": 40, "feedid": 7, "desc": True}),
+    ("addByItunesId", (123,), {}, "/add/byitunesid", {"id": 123, "pretty": 1}),
+]
+
+
+@pytest.mark.parametrize("method,args,kwargs,path,payload", CALLS)
+def test_payloads(fake_api, config, method, args, kwargs, path, payload):
+    fake_api.route(path, lambda data: {"status": "true"})
+    index = podcastindex.init(config)
+
+    getattr(index, method)(*args, **kwargs)
+    assert fake_api.calls == [(path, payload)]
+
+
+def test_build_request(config):
+    index = podcastindex.init(config)
+    url, payload = index.build_request("episodesByFeedId", 745287, fulltext=True)
+    assert url == "https://api.podcastindex.org/api/1.0/episodes/byfeedid"
+    assert payload == {"id": 745287, "max": 10, "fulltext": True}
+
+
+def test_every_method_is_registered(config):
+    index = podcastindex.init(config)
+    for name, endpoint in ENDPOINTS.items():
+        assert callable(getattr(index, name)), "{} has no PodcastIndex method".format(name)
+        arguments = list(inspect.signature(getattr(index, name)).parameters)
+        assert [p.arg for p in endpoint.params] == arguments, "{} params follow its arguments".format(name)
+
+
+def test_cache_key_ignores_payload_order():
+    endpoint = ENDPOINTS["trendingPodcasts"]
+    assert endpoint.cache_key("u", {"max": 1, "cat": "a"}) == endpoint.cache_key("u", {"cat": "a", "max": 1})
@@ -0,0 +1,75 @@
+import gzip
+import json
+import logging
+
+import pytest
+
+import podcastindex
+from podcastindex.export import NDJSONWriter
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+class FakeIndex:
+    def __init__(self, episode_ids):
+        self.episode_ids = sorted(episode_ids, reverse=True)
+        self.calls = []
+
+    def recentEpisodes(self, max=None, excluding=None, before_episode_id=None, fulltext=False):
+        self.calls.append(before_episode_id)
+        ids = [i for i in self.episode_ids if before_episode_id is None or i < before_episode_id]
+        return {"status": "true", "items": [{"id": i} for i in ids[:max]]}
+
+
+def _read_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return [json.loads(line) for line in f.read().decode("utf-8").splitlines()]
+
+
+def test_iter_results():
+    assert list(podcastindex.iter_results({"feeds": [{"id": 1}, {"id": 2}]})) == [{"id": 1}, {"id": 2}]
+    assert list(podcastindex.iter_results({"episode": {"id": 3}})) == [{"id": 3}]
+    assert list(podcastindex.iter_results({"episode": []})) == []
+
+
+def test_paginate_recent_episodes():
+    index = FakeIndex(range(1, 26))
+
+    ids = [episode["id"] for episode in podcastindex.paginate_recent_episodes(index, max=10)]
+    assert ids == list(range(25, 0, -1)), "Pagination should walk back through every episode once"
+    assert index.calls == [None, 16, 6, 1]
+
+    ids = [episode["id"] for episode in podcastindex.paginate_recent_episodes(index, max=10, limit=12)]
+    assert len(ids) == 12
+
+
+def test_export_gzip(tmpdir):
+    items = [{"id": i, "title": u"Episode é {}".format(i)} for i in range(100)]
+    files = podcastindex.export(iter(items), str(tmpdir.join("dump.ndjson")), compression="gzip")
+
+    assert files == [str(tmpdir.join("dump.ndjson.gz"))]
+    assert _read_lines(files[0]) == items
+
+
+def test_export_rotation(tmpdir):
+    items = [{"id": i, "payload": "x" * 100} for i in range(50)]
+    with NDJSONWriter(str(tmpdir.join("dump.ndjson")), max_bytes=1000, queue_size=4) as writer:
+        writer.write_all(items)
+
+    assert len(writer.files) > 1, "Writer should rotate once max_bytes is reached"
+    assert writer.files[0].endswith("dump.00000.ndjson")
+    assert writer.items_written == len(items)
+
+    read_back = []
+    for path in writer.files:
+        read_back.extend(_read_lines(path))
+    assert read_back == items
+
+
+def test_export_error_is_raised(tmpdir):
+    writer = NDJSONWriter(str(tmpdir.join("dump.ndjson")))
+    writer.write({"bad": object()})
+    with pytest.raises(TypeError):
+        writer.close()
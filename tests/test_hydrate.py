@@ -0,0 +1,68 @@
+import logging
+
+import podcastindex
+from podcastindex.hydrate import FeedHydrator
+from tests.conftest import FakeResponse
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def _podcast_by_feed_id(payload):
+    feed_id = int(payload["id"])
+    if feed_id == 404:
+        return FakeResponse({"status": "false"}, status_code=400)
+    if feed_id == 0:
+        return {"status": "true", "feed": []}
+    return {"status": "true", "feed": {"id": feed_id, "title": "Feed {}".format(feed_id)}}
+
+
+def test_hydrate_fetches_each_feed_once(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", _podcast_by_feed_id)
+    index = podcastindex.init(config)
+
+    episodes = [{"id": n, "feedId": n % 5 + 1} for n in range(50)]
+    with FeedHydrator(index) as hydrator:
+        hydrator.hydrate(episodes)
+
+    assert all(episode["feed"]["id"] == episode["feedId"] for episode in episodes)
+    assert sorted(int(call["id"]) for call in fake_api.calls_to("/podcasts/byfeedid")) == [1, 2, 3, 4, 5]
+
+
+def test_hydrate_stream_reuses_cached_feeds(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", _podcast_by_feed_id)
+    index = podcastindex.init(config)
+
+    episodes = ({"id": n, "feedId": n % 3 + 1} for n in range(30))
+    with FeedHydrator(index) as hydrator:
+        hydrated = list(hydrator.hydrate_stream(episodes, batch_size=7))
+
+    assert [episode["id"] for episode in hydrated] == list(range(30)), "Order is preserved"
+    assert len(fake_api.calls_to("/podcasts/byfeedid")) == 3
+
+
+def test_hydrate_missing_feeds(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", _podcast_by_feed_id)
+    index = podcastindex.init(config)
+
+    episodes = [{"id": 1, "feedId": 404}, {"id": 2, "feedId": 0}, {"id": 3}]
+    with FeedHydrator(index, key="podcast") as hydrator:
+        hydrator.hydrate(episodes)
+        hydrator.hydrate([{"id": 4, "feedId": 404}])
+
+    assert [episode["podcast"] for episode in episodes] == [None, None, None]
+    assert len(fake_api.calls_to("/podcasts/byfeedid")) == 2, "Missing feeds are cached too"
+
+
+def test_hydrated_feeds_are_copies(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", _podcast_by_feed_id)
+    index = podcastindex.init(config)
+
+    with FeedHydrator(index) as hydrator:
+        episodes = hydrator.hydrate([{"id": 1, "feedId": 7}, {"id": 2, "feedId": 7}])
+        episodes[0]["feed"]["title"] = "Changed"
+        hydrator.feeds([7])[7]["title"] = "Changed"
+
+        assert episodes[1]["feed"]["title"] == "Feed 7"
+        assert hydrator.hydrate([{"id": 3, "feedId": 7}])[0]["feed"]["title"] == "Feed 7"
+    assert len(fake_api.calls_to("/podcasts/byfeedid")) == 1
@@ -0,0 +1,97 @@
+import logging
+import os
+
+import pytest
+
+import podcastindex
+from podcastindex.mirror import INDEX_FILE, EpisodeMirror
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def _episode(id, feedId=1, published=None, description=None):
+    return {
+        "id": id,
+        "feedId": feedId,
+        "datePublished": published or 1000 + id,
+        "title": "Episode {}".format(id),
+        "description": description or "A fairly long description of episode {}. ".format(id) * 20,
+    }
+
+
+def test_merge_and_read(tmpdir):
+    with EpisodeMirror(str(tmpdir), compression="zlib") as mirror:
+        assert mirror.merge([_episode(n) for n in range(10)]) == (10, 0)
+        episode = mirror.get(3)
+        assert episode["title"] == "Episode 3"
+        assert dict(episode) == _episode(3)
+        assert [e["id"] for e in mirror.episodes(1)] == list(range(9, -1, -1)), "Newest first"
+        assert mirror.latest(1) == 1009
+        assert mirror.get(42) is None
+
+    data_size = os.path.getsize(os.path.join(str(tmpdir), "episodes.dat"))
+    assert data_size < sum(len(_episode(n)["description"]) for n in range(10)) / 2, "Text fields are compressed"
+
+
+def test_merge_is_idempotent(tmpdir):
+    with EpisodeMirror(str(tmpdir), compression="zlib") as mirror:
+        mirror.merge([_episode(n) for n in range(5)])
+        size = os.path.getsize(os.path.join(str(tmpdir), "episodes.dat"))
+
+        assert mirror.merge([_episode(n) for n in range(5)]) == (0, 5)
+        assert os.path.getsize(os.path.join(str(tmpdir), "episodes.dat")) == size
+
+        assert mirror.merge([_episode(2, description="Updated")]) == (1, 0)
+        assert mirror.get(2)["description"] == "Updated"
+        assert len(mirror) == 5
+
+
+def test_reopen_and_compact(tmpdir):
+    with EpisodeMirror(str(tmpdir), compression="zlib") as mirror:
+        mirror.merge([_episode(n, feedId=n % 2) for n in range(6)])
+        mirror.merge([_episode(4, feedId=0, description="Updated")])
+
+    # A torn write at the end of the index is ignored
+    with open(os.path.join(str(tmpdir), INDEX_FILE), "ab") as f:
+        f.write(b"\x01\x02\x03")
+
+    with EpisodeMirror(str(tmpdir), compression="zlib") as mirror:
+        assert len(mirror) == 6
+        assert mirror.get(4)["description"] == "Updated"
+        size = os.path.getsize(os.path.join(str(tmpdir), "episodes.dat"))
+        mirror.compact()
+        assert os.path.getsize(os.path.join(str(tmpdir), "episodes.dat")) < size
+        assert mirror.get(4)["description"] == "Updated"
+        assert sorted(e["id"] for e in mirror.episodes(1)) == [1, 3, 5]
+
+
+def test_sync_is_incremental(tmpdir, fake_api, config):
+    feeds = {1: [_episode(n, feedId=1) for n in range(5)], 2: [_episode(n, feedId=2) for n in range(10, 13)]}
+
+    def episodes_by_feed_id(payload):
+        since = int(payload.get("since") or 0)
+        items = [e for e in feeds[int(payload["id"])] if e["datePublished"] >= since]
+        return {"status": "true", "items": items}
+
+    fake_api.route("/episodes/byfeedid", episodes_by_feed_id)
+    index = podcastindex.init(config)
+
+    with EpisodeMirror(str(tmpdir), compression="zlib") as mirror:
+        assert mirror.sync(index, [1, 2])["written"] == 8
+        feeds[1].append(_episode(5, feedId=1))
+        stats = mirror.sync(index, [1, 2])
+
+    assert stats == {"feeds": 2, "fetched": 3, "written": 1, "unchanged": 2}
+    calls = fake_api.calls_to("/episodes/byfeedid")
+    assert sorted(int(call["since"]) for call in calls[2:]) == [1004, 1012], "Synced from each feed's newest episode"
+    assert all(call["fulltext"] for call in calls)
+
+
+def test_zstd_dictionary(tmpdir):
+    pytest.importorskip("zstandard")
+    with EpisodeMirror(str(tmpdir), compression="zstd", train_after=200, dictionary_size=4096) as mirror:
+        mirror.merge([_episode(n) for n in range(300)])
+        assert os.path.exists(os.path.join(str(tmpdir), "zstd.dict"))
+        assert mirror.get(5)["description"] == _episode(5)["description"]
+        assert mirror.get(250)["description"] == _episode(250)["description"]
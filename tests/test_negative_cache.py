@@ -0,0 +1,72 @@
+import logging
+import time
+
+import pytest
+import requests
+
+import podcastindex
+from tests.conftest import FakeResponse
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+badItunesId = "abcdefg1234"
+
+
+def test_negative_cache_disabled_by_default(fake_api, config):
+    fake_api.route("/podcasts/byitunesid", lambda payload: {"status": "true", "feed": []})
+    index = podcastindex.init(config)
+
+    index.podcastByItunesId(badItunesId)
+    index.podcastByItunesId(badItunesId)
+    assert len(fake_api.calls) == 2
+
+
+def test_negative_cache_empty_result(fake_api, config):
+    fake_api.route("/podcasts/byitunesid", lambda payload: {"status": "true", "feed": []})
+    fake_api.route("/podcasts/byfeedid", lambda payload: {"status": "true", "feed": {"id": payload["id"]}})
+    config["negative_cache_ttl"] = 60
+    index = podcastindex.init(config)
+
+    for _ in range(3):
+        assert index.podcastByItunesId(badItunesId)["feed"] == []
+    assert len(fake_api.calls_to("/podcasts/byitunesid")) == 1, "Not found results should be served from cache"
+
+    index.podcastByFeedId(1)
+    index.podcastByFeedId(1)
+    assert len(fake_api.calls_to("/podcasts/byfeedid")) == 2, "Found results are not negatively cached"
+
+    assert index.invalidate_negative_cache("podcastByItunesId", badItunesId)
+    index.podcastByItunesId(badItunesId)
+    assert len(fake_api.calls_to("/podcasts/byitunesid")) == 2
+
+
+def test_negative_cache_http_error(fake_api, config):
+    fake_api.route("/episodes/byguid", lambda payload: FakeResponse({"status": "false"}, status_code=400))
+    config["negative_cache_ttl"] = 60
+    index = podcastindex.init(config)
+
+    errors = []
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError) as e:
+            index.episodeByGuid("missing", feedid=1)
+        errors.append(e.value)
+    assert len(fake_api.calls) == 1
+    assert errors[1] is not errors[2], "Every hit raises its own error"
+    assert errors[2].response.status_code == 400
+    assert errors[2].response.json() == {"status": "false"}
+
+
+def test_negative_cache_expiry_and_size(fake_api, config):
+    fake_api.route("/podcasts/byfeedurl", lambda payload: {"status": "false"})
+    config["negative_cache_ttl"] = 0.05
+    config["negative_cache_size"] = 2
+    index = podcastindex.init(config)
+
+    for url in ("a", "b", "c"):
+        index.podcastByFeedUrl(url)
+    assert len(index.negative_cache) == 2, "Negative cache should stay bounded"
+
+    time.sleep(0.1)
+    index.podcastByFeedUrl("c")
+    assert len(fake_api.calls) == 4, "Expired entries should be fetched again"
@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+
+import pytest
+
+import podcastindex
+from podcastindex.pipeline import Pipeline
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def _square(item):
+    return item * item
+
+
+def test_pipeline_with_api(fake_api, config):
+    fake_api.route(
+        "/episodes/byfeedid",
+        lambda payload: {"status": "true", "items": [{"id": payload["id"] * 10 + i} for i in range(3)]},
+    )
+    index = podcastindex.init(config)
+    written = []
+    lock = threading.Lock()
+
+    def write(episode):
+        with lock:
+            written.append(episode)
+        return episode
+
+    pipeline = Pipeline(range(20), queue_size=4)
+    pipeline.stage("fetch", lambda feed_id: index.episodesByFeedId(feed_id)["items"], workers=4, flatten=True)
+    pipeline.stage("transform", lambda episode: dict(episode, seen=True), workers=2)
+    pipeline.stage("write", write)
+    stats = pipeline.run()
+
+    assert sorted(e["id"] for e in written) == sorted(f * 10 + i for f in range(20) for i in range(3))
+    assert stats["fetch"]["items_in"] == 20
+    assert stats["fetch"]["items_out"] == 60
+    assert stats["write"]["items_out"] == 60
+    assert stats["write"]["throughput"] > 0
+
+
+def test_pipeline_process_stage():
+    results = []
+    pipeline = Pipeline(range(10))
+    pipeline.stage("square", _square, workers=2, processes=True)
+    pipeline.stage("collect", results.append)
+    pipeline.run()
+    assert sorted(results) == [i * i for i in range(10)]
+
+
+def test_pipeline_backpressure():
+    produced = []
+    release = threading.Event()
+
+    def source():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    def slow(item):
+        release.wait(5)
+        return item
+
+    pipeline = Pipeline(source(), queue_size=5)
+    pipeline.stage("slow", slow, workers=1)
+    thread = threading.Thread(target=pipeline.run)
+    thread.start()
+    time.sleep(0.1)
+    assert len(produced) <= 8, "The source should be held back by the bounded queue"
+    release.set()
+    thread.join()
+    assert len(produced) == 1000
+
+
+def test_pipeline_errors():
+    def fail_on_three(item):
+        if item == 3:
+            raise RuntimeError("bad item")
+        return item
+
+    pipeline = Pipeline(range(10))
+    pipeline.stage("check", fail_on_three, workers=2)
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+
+    pipeline = Pipeline(range(10), errors="skip")
+    pipeline.stage("check", fail_on_three, workers=2)
+    stats = pipeline.run()
+    assert stats["check"]["errors"] == 1
+    assert stats["check"]["items_out"] == 9
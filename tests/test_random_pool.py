@@ -0,0 +1,112 @@
+import itertools
+import logging
+import threading
+
+import podcastindex
+from podcastindex.random_pool import RandomEpisodePool
+from tests.conftest import FakeResponse
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+class RandomEpisodes:
+    """
+    Hands out fresh ids on every call, repeating the last few of the previous batch.
+    """
+
+    def __init__(self):
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+
+    def __call__(self, payload):
+        with self.lock:
+            ids = [next(self.ids) for _ in range(int(payload["max"]))]
+        ids[:3] = [max(ids[0] - 3, 0)] * 3
+        return {"status": "true", "episodes": [{"id": id, "lang": payload.get("lang")} for id in ids]}
+
+
+def test_draws_do_not_repeat(fake_api, config):
+    fake_api.route("/episodes/random", RandomEpisodes())
+    index = podcastindex.init(config)
+    pool = RandomEpisodePool(index, batch_size=20, low_water=5)
+
+    ids = [pool.draw(lang="en")["id"] for _ in range(100)]
+    pool.close()
+
+    assert len(set(ids)) == len(ids)
+    assert all(call["lang"] == "en" for call in fake_api.calls_to("/episodes/random"))
+
+
+def test_filters_have_separate_buffers(fake_api, config):
+    fake_api.route("/episodes/random", RandomEpisodes())
+    index = podcastindex.init(config)
+    pool = RandomEpisodePool(index, batch_size=10, low_water=2)
+
+    assert pool.draw(lang="en")["lang"] == "en"
+    assert pool.draw(lang="fr")["lang"] == "fr"
+    stats = pool.stats()
+    pool.close()
+
+    assert set(stats) == set([("en", None, None), ("fr", None, None)])
+    assert stats[("en", None, None)]["draws"] == 1
+
+
+def test_memory_limits(fake_api, config):
+    fake_api.route("/episodes/random", RandomEpisodes())
+    index = podcastindex.init(config)
+    pool = RandomEpisodePool(index, batch_size=50, low_water=10, max_episodes=60, max_filters=2)
+
+    for lang in ("en", "fr", "de"):
+        pool.draw(lang=lang)
+    stats = pool.stats()
+    pool.close()
+
+    assert set(stats) == set([("fr", None, None), ("de", None, None)]), "Least recently used filters are dropped"
+    assert sum(s["buffered"] for s in stats.values()) <= 60
+
+
+def test_draw_times_out_when_nothing_arrives(fake_api, config):
+    fake_api.route("/episodes/random", lambda payload: {"status": "true", "episodes": []})
+    index = podcastindex.init(config)
+    pool = RandomEpisodePool(index)
+
+    assert pool.draw(timeout=0.2) is None
+    pool.close()
+
+
+def test_recent_filters_take_room_from_older_ones(fake_api, config):
+    fake_api.route("/episodes/random", RandomEpisodes())
+    index = podcastindex.init(config)
+    pool = RandomEpisodePool(index, batch_size=40, low_water=5, max_episodes=50)
+
+    pool.draw(lang="en")
+    assert pool.draw(lang="fr", timeout=2) is not None
+    stats = pool.stats()
+    pool.close()
+
+    assert stats[("fr", None, None)]["buffered"] > 0
+    assert sum(s["buffered"] for s in stats.values()) <= 50
+
+
+def test_refills_back_off_when_nothing_arrives(fake_api, config):
+    fake_api.route("/episodes/random", lambda payload: {"status": "true", "episodes": []})
+    index = podcastindex.init(config)
+    pool = RandomEpisodePool(index, retry_backoff=0.1, max_backoff=0.4)
+
+    assert pool.draw(timeout=1) is None
+    pool.close()
+
+    # Retries after 0, 0.1, 0.3, 0.7 seconds, then every 0.4 seconds
+    assert 3 <= len(fake_api.calls_to("/episodes/random")) <= 6
+
+
+def test_refills_back_off_on_errors(fake_api, config):
+    fake_api.route("/episodes/random", lambda payload: FakeResponse({"status": "false"}, status_code=503))
+    index = podcastindex.init(config)
+    pool = RandomEpisodePool(index, retry_backoff=10)
+
+    assert pool.draw(timeout=0.5) is None
+    pool.close()
+
+    assert len(fake_api.calls_to("/episodes/random")) == 1
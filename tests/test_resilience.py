@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+
+import pytest
+import requests
+
+import podcastindex
+from podcastindex.resilience import OPEN, CircuitBreaker, CircuitOpenError
+from tests.conftest import FakeResponse
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def test_circuit_breaker_states():
+    breaker = CircuitBreaker(failure_ratio=0.5, window=4, min_calls=4, reset_timeout=0.05)
+    for failed in (True, False, True, True):
+        assert breaker.allow()
+        breaker.record(failed)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow(), "A probe is let through after reset_timeout"
+    assert not breaker.allow(), "Only one probe at a time"
+    breaker.record(False)
+    assert breaker.allow()
+
+
+def test_circuit_breaker_fails_fast(fake_api, config):
+    healthy = [False]
+
+    def lookup(payload):
+        if healthy[0]:
+            return {"status": "true", "episode": {"id": payload["id"]}}
+        return FakeResponse({}, status_code=503)
+
+    fake_api.route("/episodes/byid", lookup)
+    config["circuit_breaker"] = {"min_calls": 5, "window": 5, "reset_timeout": 0.05}
+    index = podcastindex.init(config)
+
+    for _ in range(5):
+        with pytest.raises(requests.exceptions.HTTPError):
+            index.episodeById(1)
+    with pytest.raises(CircuitOpenError):
+        index.episodeById(1)
+    assert len(fake_api.calls) == 5, "An open breaker should not call the api"
+
+    healthy[0] = True
+    time.sleep(0.06)
+    assert index.episodeById(1)["episode"]["id"] == 1
+    assert index.circuit_breakers["episodeById"].state == "closed"
+
+
+def test_not_found_does_not_open_breaker(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", lambda payload: FakeResponse({}, status_code=404))
+    config["circuit_breaker"] = {"min_calls": 2, "window": 2}
+    index = podcastindex.init(config)
+
+    for _ in range(5):
+        with pytest.raises(requests.exceptions.HTTPError):
+            index.podcastByFeedId(1)
+    assert len(fake_api.calls) == 5
+
+
+def test_hedged_request(fake_api, config):
+    slow_once = threading.Event()
+
+    def lookup(payload):
+        if payload["id"] == "slow" and not slow_once.is_set():
+            slow_once.set()
+            time.sleep(1)
+        return {"status": "true", "feed": {"id": payload["id"]}}
+
+    fake_api.route("/podcasts/byfeedid", lookup)
+    config["hedging"] = {"min_samples": 5, "budget": 0.5}
+    index = podcastindex.init(config)
+
+    for _ in range(5):
+        index.podcastByFeedId("fast")
+
+    start = time.time()
+    assert index.podcastByFeedId("slow")["feed"]["id"] == "slow"
+    assert time.time() - start < 0.5, "The hedge should answer before the slow first attempt"
+    assert index.hedger.hedges == 1
+
+
+def test_hedging_respects_budget(fake_api, config):
+    def lookup(payload):
+        if payload["id"] == "slow":
+            time.sleep(0.2)
+        return {"status": "true", "feed": {"id": payload["id"]}}
+
+    fake_api.route("/podcasts/byfeedid", lookup)
+    config["hedging"] = {"min_samples": 5, "budget": 0}
+    index = podcastindex.init(config)
+
+    for _ in range(5):
+        index.podcastByFeedId("fast")
+    index.podcastByFeedId("slow")
+    assert index.hedger.hedges == 0
+    assert len(fake_api.calls_to("/podcasts/byfeedid")) == 6
+
+
+def test_hedging_does_not_limit_concurrency(fake_api, config):
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def lookup(payload):
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return {"status": "true", "feed": {"id": payload["id"]}}
+
+    fake_api.route("/podcasts/byfeedid", lookup)
+    config["hedging"] = {"min_samples": 5, "budget": 1, "max_workers": 4}
+    index = podcastindex.init(config)
+    for _ in range(5):
+        index.podcastByFeedId(1)
+
+    threads = [threading.Thread(target=lambda: [index.podcastByFeedId(1) for _ in range(4)]) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert in_flight[1] > 4, "Requests beyond the pool size run on the caller's thread"
+    assert index.hedger.hedges <= 4, "Queueing for a worker does not trigger hedges"
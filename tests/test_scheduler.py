@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+import pytest
+
+import podcastindex
+from podcastindex.scheduler import RequestScheduler
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Timed out waiting for condition"
+        time.sleep(0.005)
+
+
+def test_interactive_goes_first():
+    scheduler = RequestScheduler(max_concurrent=1, reserved_interactive=0)
+    order = []
+
+    def run(lane):
+        with scheduler.slot(lane):
+            order.append(lane)
+
+    scheduler.acquire("bulk")
+    threads = [threading.Thread(target=run, args=("bulk",))]
+    threads[0].start()
+    _wait_for(lambda: scheduler.stats()["bulk"]["queued"] == 1)
+    threads.append(threading.Thread(target=run, args=("interactive",)))
+    threads[1].start()
+    _wait_for(lambda: scheduler.stats()["interactive"]["queued"] == 1)
+
+    scheduler.release("bulk")
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "bulk"], "Queued interactive requests should be admitted before bulk"
+
+    stats = scheduler.stats()
+    assert stats["bulk"]["completed"] == 2
+    assert stats["interactive"]["wait_max"] > 0
+
+
+def test_unknown_lane():
+    scheduler = RequestScheduler(max_concurrent=2)
+    with pytest.raises(ValueError):
+        scheduler.acquire("urgent")
+
+
+def test_bulk_backlog_does_not_block_interactive(fake_api, config):
+    release = threading.Event()
+
+    def episodes(payload):
+        release.wait(5)
+        return {"status": "true", "items": []}
+
+    fake_api.route("/episodes/byfeedid", episodes)
+    fake_api.route("/search/byterm", lambda payload: {"status": "true", "feeds": []})
+    config["max_concurrent_requests"] = 2
+    config["reserved_interactive_slots"] = 1
+    index = podcastindex.init(config)
+
+    def backfill(feed_id):
+        with index.lane("bulk"):
+            index.episodesByFeedId(feed_id)
+
+    threads = [threading.Thread(target=backfill, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: index.scheduler.stats()["bulk"]["queued"] == 4)
+    assert index.scheduler.stats()["bulk"]["in_flight"] == 1, "Bulk traffic should leave the reserved slot free"
+
+    start = time.time()
+    index.search("This American Life")
+    assert time.time() - start < 1, "Interactive calls should not wait behind the bulk backlog"
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert index.scheduler.stats()["bulk"]["completed"] == 5
+
+
+def test_single_slot(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", lambda payload: {"status": "true", "feed": {"id": 1}})
+    config["max_concurrent_requests"] = 1
+    index = podcastindex.init(config)
+
+    assert index.scheduler.reserved_interactive == 0
+    with index.lane("bulk"):
+        assert index.podcastByFeedId(1)["feed"]["id"] == 1
+    with pytest.raises(ValueError):
+        RequestScheduler(1, reserved_interactive=1)
@@ -0,0 +1,121 @@
+import json
+import logging
+
+import pytest
+
+import podcastindex
+from podcastindex.submit import SubmissionQueue
+from tests.conftest import FakeResponse
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def test_repeated_ids_are_debounced(fake_api, config):
+    fake_api.route("/hub/pubnotify", lambda payload: {"status": "true"})
+    fake_api.route("/add/byitunesid", lambda payload: {"status": "true"})
+    index = podcastindex.init(config)
+    outcomes = []
+
+    with SubmissionQueue(index, debounce=60, on_result=lambda *args: outcomes.append(args)) as submissions:
+        for _ in range(10):
+            submissions.pub_notify(1)
+        submissions.pub_notify(2)
+        for itunes_id in range(5):
+            submissions.add_by_itunes_id(itunes_id)
+        assert len(fake_api.calls) == 0, "Nothing is sent before the debounce window ends"
+
+    assert sorted(payload["id"] for payload in fake_api.calls_to("/hub/pubnotify")) == [1, 2]
+    assert len(fake_api.calls_to("/add/byitunesid")) == 5
+    assert submissions.results[("pubNotifyUpdate", "1")]["submissions"] == 10
+    assert len(outcomes) == 7
+
+
+def test_failed_submissions_are_retried(fake_api, config):
+    attempts = []
+
+    def notify(payload):
+        attempts.append(payload["id"])
+        if len(attempts) < 3:
+            return FakeResponse({}, status_code=503)
+        return {"status": "true"}
+
+    fake_api.route("/hub/pubnotify", notify)
+    index = podcastindex.init(config)
+
+    with SubmissionQueue(index, debounce=0, retry_backoff=0.01, max_attempts=3) as submissions:
+        submissions.pub_notify(1)
+        assert submissions.flush(timeout=5)
+    assert submissions.results[("pubNotifyUpdate", "1")]["status"] == "ok"
+    assert submissions.results[("pubNotifyUpdate", "1")]["attempts"] == 3
+
+    with SubmissionQueue(index, debounce=0, retry_backoff=0.01, max_attempts=1) as submissions:
+        attempts[:] = []
+        submissions.pub_notify(2)
+    assert submissions.results[("pubNotifyUpdate", "2")]["status"] == "failed"
+
+
+def test_pending_submissions_survive_restart(fake_api, config, tmpdir):
+    fake_api.route("/hub/pubnotify", lambda payload: {"status": "true"})
+    index = podcastindex.init(config)
+    state_path = str(tmpdir.join("pending.json"))
+
+    submissions = SubmissionQueue(index, debounce=60, state_path=state_path)
+    submissions.pub_notify(1)
+    submissions.pub_notify(2)
+    submissions.close(flush=False)
+    assert len(fake_api.calls) == 0
+    with open(state_path) as f:
+        assert len(json.load(f)["pending"]) == 2
+
+    with SubmissionQueue(index, debounce=60, state_path=state_path) as submissions:
+        assert len(submissions) == 2
+    assert sorted(payload["id"] for payload in fake_api.calls_to("/hub/pubnotify")) == [1, 2]
+    with open(state_path) as f:
+        assert json.load(f)["pending"] == []
+
+
+def test_only_write_endpoints(config):
+    with SubmissionQueue(podcastindex.init(config)) as submissions:
+        with pytest.raises(ValueError):
+            submissions.submit("search", "abc")
+
+
+def test_client_errors_are_not_retried(fake_api, config):
+    fake_api.route("/add/byitunesid", lambda payload: FakeResponse({"status": "false"}, status_code=400))
+    index = podcastindex.init(config)
+
+    with SubmissionQueue(index, debounce=0, retry_backoff=0.01, max_attempts=3) as submissions:
+        submissions.add_by_itunes_id(42)
+    assert len(fake_api.calls_to("/add/byitunesid")) == 1
+    assert submissions.results[("addByItunesId", "42")]["status"] == "failed"
+
+
+def test_results_are_bounded(fake_api, config):
+    fake_api.route("/hub/pubnotify", lambda payload: {"status": "true"})
+    index = podcastindex.init(config)
+    outcomes = []
+
+    with SubmissionQueue(
+        index, debounce=0, max_results=3, on_result=lambda *args: outcomes.append(args)
+    ) as submissions:
+        for feed_id in range(10):
+            submissions.pub_notify(feed_id)
+    assert len(submissions.results) == 3
+    assert len(outcomes) == 10
+    assert all("response" not in outcome for outcome in submissions.results.values())
+    assert all(outcome["response"] == {"status": "true"} for _, _, outcome in outcomes)
+
+
+def test_open_circuit_breaker_is_retried(fake_api, config):
+    responses = [FakeResponse({}, status_code=503)]
+    fake_api.route("/hub/pubnotify", lambda payload: responses.pop() if responses else {"status": "true"})
+    breaker = {"window": 1, "min_calls": 1, "reset_timeout": 0.05}
+    index = podcastindex.init(dict(config, circuit_breaker=breaker))
+
+    with SubmissionQueue(index, debounce=0, retry_backoff=0.01, max_attempts=10) as submissions:
+        submissions.pub_notify(1)
+    result = submissions.results[("pubNotifyUpdate", "1")]
+    assert result["status"] == "ok"
+    assert result["attempts"] > 2, "Attempts made while the breaker was open were retried"
+    assert len(fake_api.calls_to("/hub/pubnotify")) == 2
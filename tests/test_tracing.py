@@ -0,0 +1,52 @@
+import logging
+import time
+
+import podcastindex
+from podcastindex.tracing import NoopTracer, RecordingTracer, SamplingProfiler
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def test_noop_tracer_by_default(config):
+    index = podcastindex.init(config)
+    assert isinstance(index.tracer, NoopTracer)
+
+
+def test_spans_cover_each_stage(fake_api, config):
+    fake_api.route("/podcasts/byfeedid", lambda payload: {"status": "true", "feed": {"id": payload["id"]}})
+    tracer = RecordingTracer()
+    config["tracer"] = tracer
+    config["max_concurrent_requests"] = 2
+    index = podcastindex.init(config)
+
+    index.podcastByFeedId(1)
+
+    names = [span["name"] for span in tracer.spans]
+    assert sorted(names) == sorted([
+        "podcastindex.request", "podcastindex.queue", "podcastindex.sign", "podcastindex.http", "podcastindex.parse",
+    ])
+    parents = dict((span["name"], span["parent"]) for span in tracer.spans)
+    assert parents["podcastindex.http"] == "podcastindex.request"
+    assert tracer.summary()["podcastindex.request"]["count"] == 1
+
+
+def _busy_wait(seconds):
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+def test_sampling_profiler(tmpdir):
+    with SamplingProfiler(interval=0.001) as profiler:
+        _busy_wait(0.2)
+
+    assert profiler.samples > 0
+    assert any("_busy_wait" in stack for stack in profiler.stacks)
+
+    path = str(tmpdir.join("profile.folded"))
+    profiler.dump(path)
+    with open(path) as f:
+        for line in f:
+            stack, count = line.rsplit(" ", 1)
+            assert int(count) > 0
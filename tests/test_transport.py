@@ -0,0 +1,108 @@
+import json
+import logging
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+
+import podcastindex
+from podcastindex.transport import DNSCache
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"status": "true", "feed": {"id": 1}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        request = HTTPServer.get_request(self)
+        self.connections += 1
+        return request
+
+
+@pytest.fixture
+def server():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _config(server, **kwargs):
+    config = {"api_key": "key", "api_secret": "secret"}
+    config["base_url"] = "http://localhost:{}/api/1.0".format(server.server_address[1])
+    config.update(kwargs)
+    return config
+
+
+def _accepted_connections(server, expected, timeout=5):
+    # The server thread counts a connection when it gets round to accepting it, possibly after the client
+    # has already connected
+    deadline = time.time() + timeout
+    while server.connections < expected and time.time() < deadline:
+        time.sleep(0.01)
+    return server.connections
+
+
+def test_warm_connections_are_reused(server):
+    index = podcastindex.init(_config(server, pool_size=4))
+    assert index.warm_up(3) == 3
+
+    for _ in range(5):
+        assert index.podcastByFeedId(1)["feed"]["id"] == 1
+    assert _accepted_connections(server, 3) == 3, "Requests use the pre-opened connections"
+
+
+def test_requests_reuse_connections_without_warm_up(server):
+    index = podcastindex.init(_config(server))
+    for _ in range(5):
+        index.podcastByFeedId(1)
+    assert server.connections == 1
+
+
+def test_dns_cache(server, monkeypatch):
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host, *args, **kwargs):
+        lookups.append(host)
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+    index = podcastindex.init(_config(server, dns_cache_ttl=60, warm_connections=2))
+    for _ in range(3):
+        index.podcastByFeedId(1)
+
+    assert lookups.count("localhost") == 1
+    assert index.dns_cache.lookups == 1
+
+
+def test_dns_cache_expires(monkeypatch):
+    cache = DNSCache(ttl=0)
+    assert cache.resolve("127.0.0.1", 80) == [("127.0.0.1", 80)]
+    cache.resolve("127.0.0.1", 80)
+    assert cache.lookups == 2
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import random
+
+import pytest
+
+import podcastindex
+from podcastindex.trending import TrendingRecorder
+
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger()
+
+
+def _rankings(count=100, size=50, seed=1):
+    """
+    Rankings that drift a little between snapshots, like real trending lists.
+    """
+    rng = random.Random(seed)
+    ranking = list(range(1000, 1000 + size))
+    next_id = 1000 + size
+    rankings = []
+    for _ in range(count):
+        ranking = list(ranking)
+        for _ in range(3):
+            i = rng.randrange(size - 1)
+            ranking[i], ranking[i + 1] = ranking[i + 1], ranking[i]
+        ranking[rng.randrange(size)] = next_id
+        next_id += 1
+        rankings.append(ranking)
+    return rankings
+
+
+def _response(ranking):
+    return {"status": "true", "feeds": [{"id": feed_id, "title": "Feed {}".format(feed_id)} for feed_id in ranking]}
+
+
+def test_snapshots_round_trip(tmpdir):
+    path = str(tmpdir.join("trending.log"))
+    rankings = _rankings()
+    with TrendingRecorder(path, keyframe_interval=8) as recorder:
+        for t, ranking in enumerate(rankings):
+            recorder.record(_response(ranking), timestamp=t, lang=["en"], max=50)
+        assert recorder.snapshot(at=37, lang=["en"], max=50) == rankings[37]
+
+    raw_size = sum(len(json.dumps(_response(ranking))) for ranking in rankings)
+    assert os.path.getsize(path) < raw_size / 5
+
+    with TrendingRecorder(path, keyframe_interval=8) as recorder:
+        assert recorder.filters() == [{"lang": ["en"], "max": 50}]
+        assert recorder.snapshot(lang=["en"], max=50) == rankings[-1]
+        assert recorder.snapshot(at=63.5, lang=["en"], max=50) == rankings[63]
+        assert recorder.snapshot(at=-1, lang=["en"], max=50) == []
+
+
+def test_rank_history(tmpdir):
+    rankings = [[1, 2, 3], [2, 1, 3], [2, 3, 4], [1, 2, 3]]
+    with TrendingRecorder(str(tmpdir.join("trending.log"))) as recorder:
+        for t, ranking in enumerate(rankings):
+            recorder.record(_response(ranking), timestamp=100 + t, categories=["News", "Tech"])
+
+        history = recorder.rank_history(1, categories=["News", "Tech"])
+        assert history == [(100, 1), (101, 2), (102, None), (103, 1)]
+        with pytest.raises(KeyError):
+            recorder.rank_history(1, categories="News,Tech")
+        assert recorder.rank_history(3, since=101, until=102, categories=["News", "Tech"]) == [(101, 3), (102, 2)]
+        with pytest.raises(KeyError):
+            recorder.rank_history(1, lang="fr")
+
+
+def test_movers(tmpdir):
+    with TrendingRecorder(str(tmpdir.join("trending.log"))) as recorder:
+        recorder.record(_response([1, 2, 3, 4, 5]), timestamp=10)
+        recorder.record(_response([5, 1, 2, 3, 6]), timestamp=20)
+        recorder.record(_response([5, 2, 1, 3, 6]), timestamp=30)
+
+        movers = recorder.movers(since=10)
+        assert movers[0] == {"feedId": 5, "title": "Feed 5", "rank": 1, "previous_rank": 5, "change": 4}
+        assert set((m["feedId"], m["change"]) for m in movers) == set([(5, 4), (4, -2), (6, 1), (1, -2), (3, -1)])
+
+        assert [m["feedId"] for m in recorder.movers(since=20, until=30)] == [1, 2]
+
+
+def test_torn_record_is_dropped(tmpdir):
+    path = str(tmpdir.join("trending.log"))
+    with TrendingRecorder(path) as recorder:
+        recorder.record(_response([1, 2]), timestamp=1)
+    with open(path, "ab") as f:
+        f.write(b"\x02\x00\x00")
+
+    with TrendingRecorder(path) as recorder:
+        recorder.record(_response([2, 1]), timestamp=2)
+    with TrendingRecorder(path) as recorder:
+        assert recorder.rank_history(2) == [(1, 2), (2, 1)]
+
+
+def test_poll(tmpdir, fake_api, config):
+    fake_api.route("/podcasts/trending", lambda payload: _response([int(payload.get("max", 10)), 7]))
+    index = podcastindex.init(config)
+
+    with TrendingRecorder(str(tmpdir.join("trending.log"))) as recorder:
+        recorder.poll(index, [{"max": 3, "lang": ["en"]}, {"max": 4, "lang": ["en"]}])
+        assert recorder.snapshot(max=3, lang=["en"]) == [3, 7]
+        assert recorder.snapshot(max=4, lang=["en"]) == [4, 7]
+
+
+def test_poll_keeps_filters_as_passed(tmpdir, fake_api, config):
+    fake_api.route("/podcasts/trending", lambda payload: _response([1, 2]))
+    index = podcastindex.init(config)
+
+    with TrendingRecorder(str(tmpdir.join("trending.log"))) as recorder:
+        recorder.poll(index, [{"lang": ["en"], "categories": ["News", "Tech"]}])
+        recorder.poll(index, recorder.filters())
+        assert recorder.filters() == [{"lang": ["en"], "categories": ["News", "Tech"]}]
+
+        with pytest.raises(ValueError):
+            recorder.poll(index, [{"lang": "en"}])
+        with pytest.raises(ValueError):
+            recorder.poll(index, [{"since": -3600}])
+
+    calls = fake_api.calls_to("/podcasts/trending")
+    assert len(calls) == 2, "Invalid filters are rejected before fetching"
+    assert all(call["lang"] == "en" and call["cat"] == "News,Tech" for call in calls)